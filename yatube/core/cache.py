@@ -0,0 +1,135 @@
+"""Two-level cache: a small in-process L1 in front of a shared L2.
+
+Configure the shared tier as its own entry in CACHES and point the
+tiered one at it by alias:
+
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'LOCAL_TIMEOUT': 2},
+    }
+
+Reads are served from L1 for at most LOCAL_TIMEOUT seconds, so another
+worker's writes become visible within that window. add() and incr()
+always go to the shared tier, which keeps cache locks and counters
+correct across processes.
+"""
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = int(options.get('LOCAL_TIMEOUT', 2))
+        self._local = LocMemCache(f'tiered:{location}', {
+            'TIMEOUT': self._local_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+            },
+        })
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def _shared(self):
+        return caches[self._shared_alias]
+
+    def _count(self, outcome, amount=1):
+        if amount:
+            with self._stats_lock:
+                self._stats[outcome] += amount
+
+    def stats(self):
+        """Hit counters of this process, split by tier"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        hits = stats['local_hits'] + stats['shared_hits']
+        stats['hit_rate'] = hits / total if total else 0.0
+        return stats
+
+    def _local_ttl(self, timeout):
+        """L1 never keeps an entry longer than the shared tier does"""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self._local_timeout
+        return min(timeout, self._local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version)
+        if added:
+            self._local.set(key, value, self._local_ttl(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = self._local.get(key, sentinel, version)
+        if value is not sentinel:
+            self._count('local_hits')
+            return value
+        value = self._shared.get(key, sentinel, version)
+        if value is sentinel:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local.set(key, value, self._local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self._local.get_many(keys, version)
+        self._count('local_hits', len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self._shared.get_many(missing, version)
+            self._count('shared_hits', len(shared))
+            self._count('misses', len(missing) - len(shared))
+            if shared:
+                self._local.set_many(shared, self._local_timeout, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version)
+        self._local.set(key, value, self._local_ttl(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version)
+        self._local.set_many(data, self._local_ttl(timeout), version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._local.delete(key, version)
+        self._shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self._local.delete_many(keys, version)
+        self._shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return (self._local.has_key(key, version)
+                or self._shared.has_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(key, version)
+        return self._shared.incr(key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        self._local.delete(key, version)
+        return self._shared.decr(key, delta, version)
+
+    def clear(self):
+        self._local.clear()
+        self._shared.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
@@ -0,0 +1,67 @@
+"""Running the independent queries of one request side by side.
+
+run_concurrently() hands each callable to a shared pool of
+FEED_QUERY_WORKERS threads and returns their results in order, so a view
+waits for its slowest query instead of the sum of them. Every worker
+uses its own database connections and closes them like a request
+would. The execute wrappers and the metrics record of the calling thread
+are installed in the worker, so request metrics still see every query
+and cache lookup, and reads stay on the replica when the caller is
+inside reading_from_replica().
+
+With FEED_QUERY_WORKERS = 0, the default and what tests run with, the
+callables are simply called one after another in the calling thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import metrics
+from .db import reading_from_replica, replica_reads_active
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.FEED_QUERY_WORKERS,
+            thread_name_prefix='feed-queries',
+        )
+    return _executor
+
+
+def _call(function, wrappers, record, replica):
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(metrics.attached(record))
+            if replica:
+                stack.enter_context(reading_from_replica())
+            for alias, installed in wrappers.items():
+                connection = connections[alias]
+                for wrapper in installed:
+                    if wrapper not in connection.execute_wrappers:
+                        stack.enter_context(
+                            connection.execute_wrapper(wrapper))
+            return function()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(*functions):
+    """Results of calling every function, exceptions re-raised in order"""
+    if settings.FEED_QUERY_WORKERS <= 0 or len(functions) < 2:
+        return [function() for function in functions]
+    wrappers = {alias: list(connections[alias].execute_wrappers)
+                for alias in connections}
+    record = metrics.current()
+    replica = replica_reads_active()
+    futures = [
+        _get_executor().submit(_call, function, wrappers, record, replica)
+        for function in functions
+    ]
+    return [future.result() for future in futures]
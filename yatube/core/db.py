@@ -0,0 +1,69 @@
+"""SQLite tuning and read routing for the production database profile.
+
+Pragmas are per connection, so every alias may list its own under a
+PRAGMAS key in DATABASES; they are applied as soon as Django opens the
+connection. The read-only replica alias is a second connection to the
+same file: in WAL mode readers never wait for the writer, so sending
+the reads of GET and HEAD requests there keeps them off the default
+connection, and mode=ro makes sure nothing can write through it.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_ALIAS = 'replica'
+
+_local = threading.local()
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def replica_reads_active():
+    """Whether this thread is inside reading_from_replica()"""
+    return getattr(_local, 'active', False)
+
+
+@contextmanager
+def reading_from_replica():
+    """Route the reads of this thread to the replica while active"""
+    previous = replica_reads_active()
+    _local.active = True
+    try:
+        yield
+    finally:
+        _local.active = previous
+
+
+class ReadReplicaRouter:
+    """Replica reads inside reading_from_replica(), the rest on default.
+
+    A read inside an open transaction on default stays there, it has to
+    see that transaction's own writes. Writes always go to default, even
+    for instances that were loaded from the replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (replica_reads_active()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
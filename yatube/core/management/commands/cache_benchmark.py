@@ -0,0 +1,102 @@
+import itertools
+import multiprocessing
+import random
+import resource
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def zipf_weights(keyspace, skew):
+    return list(itertools.accumulate(
+        1 / (rank ** skew) for rank in range(1, keyspace + 1)
+    ))
+
+
+def run_worker(alias, operations, keyspace, skew, payload_size, seed, queue):
+    """Read-through loop against one cache alias in a worker process"""
+    connections.close_all()
+    cache = caches[alias]
+    rng = random.Random(seed)
+    weights = zipf_weights(keyspace, skew)
+    keys = [f'bench:{rank}' for rank in range(keyspace)]
+    hits = misses = 0
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for key in rng.choices(keys, cum_weights=weights, k=operations):
+        if cache.get(key) is None:
+            misses += 1
+            cache.set(key, bytes(payload_size), 300)
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - started
+    stats = cache.stats() if hasattr(cache, 'stats') else {}
+    queue.put({
+        'hits': hits,
+        'misses': misses,
+        'seconds': elapsed,
+        'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'rss_growth_kb': (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        ),
+        'local_hits': stats.get('local_hits'),
+        'shared_hits': stats.get('shared_hits'),
+    })
+
+
+class Command(BaseCommand):
+    help = ('Hit the cache from several processes with a skewed key '
+            'pattern and report hit rate and memory per worker')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=20000)
+        parser.add_argument('--keyspace', type=int, default=5000)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--payload-size', type=int, default=4096)
+
+    def handle(self, *args, **options):
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise CommandError('The benchmark needs fork() to share setup')
+        caches[options['alias']].clear()
+        queue = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(
+                options['alias'], options['operations'],
+                options['keyspace'], options['skew'],
+                options['payload_size'], seed, queue,
+            ))
+            for seed in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        backend = caches[options['alias']].__class__.__name__
+        self.stdout.write(
+            f'{backend} ({options["alias"]}), {options["workers"]} workers'
+        )
+        for number, result in enumerate(results, 1):
+            rate = result['hits'] / (result['hits'] + result['misses'])
+            line = (f'  worker {number}: hit rate {rate:.1%}, '
+                    f'{options["operations"] / result["seconds"]:.0f} ops/s, '
+                    f'max RSS {result["rss_kb"] / 1024:.1f} MiB '
+                    f'(+{result["rss_growth_kb"] / 1024:.1f} MiB)')
+            if result['local_hits'] is not None:
+                line += (f', L1 hits {result["local_hits"]}, '
+                         f'L2 hits {result["shared_hits"]}')
+            self.stdout.write(line)
+        hits = sum(result['hits'] for result in results)
+        total = hits + sum(result['misses'] for result in results)
+        growth = sum(result['rss_growth_kb'] for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'overall hit rate {hits / total:.1%}, '
+            f'cache memory across workers +{growth / 1024:.1f} MiB'
+        ))
@@ -0,0 +1,114 @@
+import multiprocessing
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from posts.models import Comment, Post, User
+
+from ...db import reading_from_replica
+
+
+def run_reader(seconds, seed, post_count, queue):
+    """Feed pages at random depths, the way GET requests read them"""
+    connections.close_all()
+    rng = random.Random(seed)
+    done = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    with reading_from_replica():
+        while time.monotonic() < deadline:
+            offset = rng.randrange(max(post_count - settings.NMB_OF_ITEMS,
+                                       1))
+            started = time.perf_counter()
+            try:
+                list(Post.objects.for_feed()
+                     [offset:offset + settings.NMB_OF_ITEMS])
+                Post.objects.count()
+                done += 1
+            except OperationalError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+    queue.put(('read', done, errors, latencies))
+
+
+def run_writer(seconds, seed, post_ids, user_ids, queue):
+    """Comments through the ORM, signals and all"""
+    connections.close_all()
+    rng = random.Random(seed)
+    done = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            Comment.objects.create(post_id=rng.choice(post_ids),
+                                   author_id=rng.choice(user_ids),
+                                   text='Benchmark comment')
+            done += 1
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    queue.put(('write', done, errors, latencies))
+
+
+class Command(BaseCommand):
+    help = ('Read feed pages and write comments from several processes at '
+            'once and report throughput, latency and lock errors. Compare '
+            'runs with DB_PROFILE=production and without.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise CommandError('The benchmark needs fork() to share setup')
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError('Nothing to benchmark, run seed_social')
+        post_count = Post.objects.count()
+        connections.close_all()
+        queue = context.Queue()
+        workers = [
+            context.Process(target=run_reader, args=(
+                options['seconds'], seed, post_count, queue))
+            for seed in range(options['readers'])
+        ] + [
+            context.Process(target=run_writer, args=(
+                options['seconds'], seed, post_ids, user_ids, queue))
+            for seed in range(options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(
+            f'profile {settings.DB_PROFILE}, journal_mode {journal_mode}, '
+            f'replica {"on" if "replica" in settings.DATABASES else "off"}'
+        )
+        for kind in ('read', 'write'):
+            done = sum(result[1] for result in results if result[0] == kind)
+            errors = sum(result[2] for result in results
+                         if result[0] == kind)
+            latencies = sorted(latency for result in results
+                               if result[0] == kind
+                               for latency in result[3])
+            if not latencies:
+                continue
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            self.stdout.write(
+                f'  {kind}s: {done / options["seconds"]:.0f}/s, '
+                f'p99 {p99:.1f} ms, {errors} lock errors'
+            )
@@ -0,0 +1,228 @@
+"""In-process request metrics.
+
+Every view gets a fixed set of bucketed histograms (wall, DB and
+template time, query count) and hit/miss counters of the default
+cache. Buckets are fixed, so memory stays bounded however long the
+worker lives; quantiles are estimated from the buckets. Numbers are per
+worker process, exactly like fragment_stats() and TieredCache.stats().
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.histograms = {
+            'request_seconds': Histogram(SECONDS_BUCKETS),
+            'db_seconds': Histogram(SECONDS_BUCKETS),
+            'template_seconds': Histogram(SECONDS_BUCKETS),
+            'db_queries': Histogram(QUERY_BUCKETS),
+        }
+        self.counters = defaultdict(int)
+
+
+_views = defaultdict(ViewMetrics)
+
+
+class RequestRecord:
+    """What one request spent, filled in while it runs"""
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook"""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += perf_counter() - started
+            self.db_queries += 1
+
+
+def current():
+    return getattr(_local, 'record', None)
+
+
+@contextmanager
+def recording():
+    record = _local.record = RequestRecord()
+    try:
+        yield record
+    finally:
+        _local.record = None
+
+
+@contextmanager
+def attached(record):
+    """Make another thread's record the current one of this thread"""
+    previous = current()
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = previous
+
+
+def observe(view, status, seconds, record):
+    with _lock:
+        metrics = _views[view]
+        metrics.histograms['request_seconds'].observe(seconds)
+        metrics.histograms['db_seconds'].observe(record.db_seconds)
+        metrics.histograms['template_seconds'].observe(
+            record.template_seconds)
+        metrics.histograms['db_queries'].observe(record.db_queries)
+        metrics.counters['cache_hits'] += record.cache_hits
+        metrics.counters['cache_misses'] += record.cache_misses
+        metrics.counters[f'responses_{status // 100}xx'] += 1
+
+
+@contextmanager
+def timed_render():
+    """Time a template render, leaving out renders nested inside it"""
+    record = current()
+    if record is None:
+        yield
+        return
+    record.template_depth += 1
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        record.template_depth -= 1
+        if not record.template_depth:
+            record.template_seconds += perf_counter() - started
+
+
+def count_cache_lookups(backend):
+    """Make a cache backend report hits and misses to the request record"""
+    if getattr(backend, '_counts_lookups', False):
+        return
+    get, get_many = backend.get, backend.get_many
+    missing = object()
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, missing, version)
+        record = current()
+        if record is not None:
+            if value is missing:
+                record.cache_misses += 1
+            else:
+                record.cache_hits += 1
+        return default if value is missing else value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        record = current()
+        if record is None:
+            return get_many(keys, version)
+        # BaseCache.get_many() loops over self.get(), which is counted
+        # already; count the batch once, as the caller sees it.
+        hits, misses = record.cache_hits, record.cache_misses
+        found = get_many(keys, version)
+        record.cache_hits = hits + len(found)
+        record.cache_misses = misses + len(keys) - len(found)
+        return found
+
+    backend.get = counted_get
+    backend.get_many = counted_get_many
+    backend._counts_lookups = True
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def snapshot():
+    with _lock:
+        return {
+            view: {
+                **{name: histogram.snapshot()
+                   for name, histogram in metrics.histograms.items()},
+                **metrics.counters,
+            }
+            for view, metrics in _views.items()
+        }
+
+
+def prometheus_text():
+    """The histograms in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        views = sorted(_views.items())
+        for name in ('request_seconds', 'db_seconds', 'template_seconds',
+                     'db_queries'):
+            metric = f'yatube_view_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            for view, metrics in views:
+                histogram = metrics.histograms[name]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{view="{view}",'
+                                 f'le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{view="{view}",le="+Inf"}} '
+                             f'{histogram.count}')
+                lines.append(f'{metric}_sum{{view="{view}"}} '
+                             f'{histogram.sum}')
+                lines.append(f'{metric}_count{{view="{view}"}} '
+                             f'{histogram.count}')
+        counters = sorted({name for _, metrics in views
+                           for name in metrics.counters})
+        for name in counters:
+            metric = f'yatube_view_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for view, metrics in views:
+                lines.append(f'{metric}{{view="{view}"}} '
+                             f'{metrics.counters.get(name, 0)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,73 @@
+import cProfile
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connections
+
+from . import metrics
+from .db import reading_from_replica
+
+
+class RequestMetricsMiddleware:
+    """Feed core.metrics with the cost of every request.
+
+    Keep it first in MIDDLEWARE so the wall time covers the rest of the
+    stack. A METRICS_PROFILE_RATE share of requests also runs under
+    cProfile and is dumped into METRICS_PROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.count_cache_lookups(caches[DEFAULT_CACHE_ALIAS])
+        profiler = None
+        if random.random() < settings.METRICS_PROFILE_RATE:
+            profiler = cProfile.Profile()
+        with metrics.recording() as record, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            started = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            elapsed = time.perf_counter() - started
+        view = self.view_name(request)
+        metrics.observe(view, response.status_code, elapsed, record)
+        if profiler is not None:
+            self.dump(profiler, view)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def dump(profiler, view):
+        os.makedirs(settings.METRICS_PROFILE_DIR, exist_ok=True)
+        name = f'{view.replace(":", ".")}-{time.time_ns()}.prof'
+        profiler.dump_stats(os.path.join(settings.METRICS_PROFILE_DIR, name))
+
+
+class ReadReplicaMiddleware:
+    """Send the reads of GET and HEAD requests to the replica alias"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        with reading_from_replica():
+            return self.get_response(request)
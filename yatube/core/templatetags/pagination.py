@@ -0,0 +1,28 @@
+from django import template
+
+register = template.Library()
+
+PAGE_WINDOW = 3
+
+
+@register.filter
+def page_window(page_obj, radius=PAGE_WINDOW):
+    """Page numbers around the current one plus the first and the last.
+
+    None stands for a run of skipped numbers, so a feed of thousands of
+    pages renders a dozen links instead of all of them.
+    """
+    last = page_obj.paginator.num_pages
+    shown = sorted({
+        1, last,
+        *range(max(page_obj.number - radius, 1),
+               min(page_obj.number + radius, last) + 1),
+    })
+    numbers = []
+    previous = 0
+    for number in shown:
+        if number - previous > 1:
+            numbers.append(None)
+        numbers.append(number)
+        previous = number
+    return numbers
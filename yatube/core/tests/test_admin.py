@@ -0,0 +1,75 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from .. import admin as large_admin
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create(username='admin', is_staff=True,
+                                        is_superuser=True)
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        for i in range(3):
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        response = self.client.get(
+            reverse(f'admin:posts_{model}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.changelist('post')
+        with self.assertNumQueries(6) as first:
+            self.changelist('post')
+        for i in range(20):
+            Post.objects.create(text=f'Ещё {i}', author=self.reader,
+                                group=Group.objects.first())
+        with self.assertNumQueries(len(first)):
+            self.changelist('post')
+
+    def test_count_is_bounded_and_full_count_skipped(self):
+        large_admin.EXACT_COUNT_LIMIT, limit = 2, large_admin.EXACT_COUNT_LIMIT
+        try:
+            for i in range(4):
+                Post.objects.create(text=f'Ещё {i}', author=self.reader)
+            cl = self.changelist('post')
+            self.assertGreaterEqual(cl.result_count, 5)
+            self.assertIsNone(cl.full_result_count)
+            cl = self.changelist('post', author__username='reader')
+            self.assertEqual(cl.result_count, 2)
+        finally:
+            large_admin.EXACT_COUNT_LIMIT = limit
+
+    def test_input_filters_match_exactly(self):
+        cl = self.changelist('comment', author__username='reader')
+        self.assertEqual(cl.result_count, 1)
+        cl = self.changelist('follow', user__username='author')
+        self.assertEqual(cl.result_count, 0)
+
+    def test_bad_filter_value_is_rejected(self):
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'post': 'x'})
+        self.assertRedirects(
+            response, reverse('admin:posts_comment_changelist') + '?e=1',
+            fetch_redirect_response=False)
+
+    def test_follow_search_goes_through_usernames(self):
+        cl = self.changelist('follow', q='author')
+        self.assertEqual(list(cl.result_list),
+                         list(Follow.objects.filter(author=self.author)))
+        self.assertEqual(self.changelist('follow', q='auth').result_count,
+                         0)
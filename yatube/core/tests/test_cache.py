@@ -0,0 +1,48 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tiered': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'LOCAL_TIMEOUT': 60},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-cache-test',
+    },
+})
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tiered = caches['tiered']
+        self.shared = caches['shared']
+        self.tiered.clear()
+
+    def test_reads_fill_local_tier(self):
+        before = self.tiered.stats()
+        self.shared.set('key', 'value')
+        self.assertEqual(self.tiered.get('key'), 'value')
+        self.shared.delete('key')
+        self.assertEqual(self.tiered.get('key'), 'value')
+        after = self.tiered.stats()
+        self.assertEqual(after['shared_hits'] - before['shared_hits'], 1)
+        self.assertEqual(after['local_hits'] - before['local_hits'], 1)
+
+    def test_writes_go_through_to_shared_tier(self):
+        self.tiered.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.shared.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.tiered.delete('a')
+        self.assertIsNone(self.shared.get('a'))
+        self.assertIsNone(self.tiered.get('a'))
+
+    def test_add_and_incr_are_decided_by_shared_tier(self):
+        self.shared.set('lock', 1)
+        self.assertFalse(self.tiered.add('lock', 2))
+        self.shared.set('counter', 1)
+        self.tiered.get('counter')
+        self.assertEqual(self.tiered.incr('counter'), 2)
+        self.assertEqual(self.tiered.get('counter'), 2)
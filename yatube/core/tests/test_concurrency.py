@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from yatube.asgi import application
+
+from .. import metrics
+from ..concurrency import run_concurrently
+from ..db import reading_from_replica, replica_reads_active
+
+
+class RunConcurrentlyTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_sequential_without_workers(self):
+        threads = run_concurrently(threading.get_ident,
+                                   threading.get_ident)
+        self.assertEqual(threads, [threading.get_ident()] * 2)
+
+    @override_settings(FEED_QUERY_WORKERS=2)
+    def test_results_keep_their_order(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(value):
+            barrier.wait()
+            return value
+
+        self.assertEqual(
+            run_concurrently(lambda: meet('a'), lambda: meet('b')),
+            ['a', 'b'],
+        )
+
+    @override_settings(FEED_QUERY_WORKERS=2)
+    def test_exceptions_reach_the_caller(self):
+        def fail():
+            raise LookupError
+
+        with self.assertRaises(LookupError):
+            run_concurrently(lambda: None, fail)
+
+    @override_settings(FEED_QUERY_WORKERS=2)
+    def test_worker_queries_pass_through_caller_wrappers(self):
+        seen = []
+
+        def record(execute, sql, params, many, context):
+            seen.append(sql)
+            return execute(sql, params, many, context)
+
+        def select():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                return threading.get_ident()
+
+        with connection.execute_wrapper(record):
+            threads = run_concurrently(select, select)
+        self.assertEqual(seen, ['SELECT 1'] * 2)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    @override_settings(FEED_QUERY_WORKERS=2)
+    def test_workers_share_the_caller_metrics_record(self):
+        with metrics.recording() as record:
+            records = run_concurrently(metrics.current, metrics.current)
+        self.assertEqual(records, [record, record])
+        self.assertEqual(run_concurrently(metrics.current, metrics.current),
+                         [None, None])
+
+    @override_settings(FEED_QUERY_WORKERS=2)
+    def test_workers_read_from_the_replica_with_the_caller(self):
+        with reading_from_replica():
+            self.assertEqual(
+                run_concurrently(replica_reads_active, replica_reads_active),
+                [True, True],
+            )
+        self.assertEqual(
+            run_concurrently(replica_reads_active, replica_reads_active),
+            [False, False],
+        )
+
+
+class ASGIAdapterTests(SimpleTestCase):
+    def call(self, scope, messages):
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def request(self, path, method='GET', body=b'', headers=()):
+        scope = {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': list(headers),
+        }
+        chunks = [body[:3], body[3:]] if body else [b'']
+        messages = [
+            {'type': 'http.request', 'body': chunk,
+             'more_body': number < len(chunks) - 1}
+            for number, chunk in enumerate(chunks)
+        ]
+        return self.call(scope, messages)
+
+    def test_response_is_streamed_back(self):
+        sent = self.request(reverse('about:author'))
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Об авторе'.encode(), body)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_unknown_path_is_not_found(self):
+        self.assertEqual(self.request('/missing/')[0]['status'], 404)
+
+    def test_request_body_and_headers_reach_django(self):
+        token = 'a' * 64
+        body = f'csrfmiddlewaretoken={token}'.encode()
+        sent = self.request(
+            reverse('about:author'), method='POST', body=body,
+            headers=[(b'content-type', b'application/x-www-form-urlencoded'),
+                     (b'content-length', str(len(body)).encode()),
+                     (b'cookie', f'csrftoken={token}'.encode())],
+        )
+        # Past the CSRF check only if both the cookie and the form arrived.
+        self.assertEqual(sent[0]['status'], 405)
+
+    def test_disconnect_before_body_sends_nothing(self):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/',
+                 'query_string': b'', 'headers': []}
+        self.assertEqual(self.call(scope, [{'type': 'http.disconnect'}]),
+                         [])
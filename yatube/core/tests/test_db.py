@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import RequestFactory, SimpleTestCase
+
+from posts.models import Post
+
+from ..db import REPLICA_ALIAS, ReadReplicaRouter, reading_from_replica
+from ..middleware import ReadReplicaMiddleware
+
+
+class PragmaTests(SimpleTestCase):
+    def test_alias_pragmas_are_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'tuned.sqlite3'),
+                'PRAGMAS': {'journal_mode': 'wal', 'synchronous': 'normal',
+                            'cache_size': -1024},
+            }
+            wrapper = DatabaseWrapper(settings_dict, alias='tuned')
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous',
+                                 'cache_size'):
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1,
+                                   'cache_size': -1024})
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    databases = {'default'}
+    router = ReadReplicaRouter()
+
+    def test_reads_go_to_the_replica_only_when_asked(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        with reading_from_replica():
+            self.assertEqual(self.router.db_for_read(Post), REPLICA_ALIAS)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_reads_in_a_transaction_stay_on_default(self):
+        with reading_from_replica(), transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_writes_and_migrations_stay_on_default(self):
+        with reading_from_replica():
+            self.assertEqual(self.router.db_for_write(Post),
+                             DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate(REPLICA_ALIAS, 'posts'))
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'posts'))
+
+    def test_middleware_routes_safe_methods(self):
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Post))
+
+        middleware = ReadReplicaMiddleware(view)
+        middleware(RequestFactory().get('/'))
+        middleware(RequestFactory().post('/'))
+        self.assertEqual(routed, [REPLICA_ALIAS, None])
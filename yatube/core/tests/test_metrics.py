@@ -0,0 +1,82 @@
+import os
+import pstats
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_come_from_bucket_bounds(self):
+        histogram = metrics.Histogram((1, 2, 5))
+        for value in (0.5, 1.5, 1.5, 4, 100):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertEqual(histogram.quantile(0.8), 5)
+        self.assertEqual(histogram.quantile(0.99), float('inf'))
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        Post.objects.create(text='Post', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_view_costs_are_recorded(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        view = self.staff_client.get(
+            reverse('metrics'), {'format': 'json'}
+        ).json()['posts:index']
+        self.assertEqual(view['request_seconds']['count'], 2)
+        self.assertGreater(view['db_queries']['sum'], 0)
+        self.assertGreater(view['template_seconds']['sum'], 0)
+        self.assertGreater(view['cache_hits'], 0)
+        self.assertGreater(view['cache_misses'], 0)
+        self.assertEqual(view['responses_2xx'], 2)
+
+    def test_prometheus_text(self):
+        self.client.get(reverse('posts:index'))
+        response = self.staff_client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_view_request_seconds histogram', text)
+        self.assertIn(
+            'yatube_view_request_seconds_bucket{view="posts:index",'
+            'le="+Inf"} 1', text
+        )
+        self.assertIn('yatube_view_cache_misses_total{view="posts:index"}',
+                      text)
+
+    def test_endpoint_is_staff_only(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_sampled_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_PROFILE_RATE=1,
+                                   METRICS_PROFILE_DIR=directory):
+                self.client.get(reverse('posts:index'))
+            dumps = os.listdir(directory)
+            self.assertEqual(len(dumps), 1)
+            self.assertTrue(dumps[0].startswith('posts.index-'))
+            stats = pstats.Stats(os.path.join(directory, dumps[0]))
+            self.assertTrue(any('views.py' in function[0]
+                                for function in stats.stats))
@@ -0,0 +1,20 @@
+from django.core.paginator import Paginator
+from django.test import SimpleTestCase
+
+from ..templatetags.pagination import page_window
+
+
+class PageWindowTests(SimpleTestCase):
+    paginator = Paginator(range(1000), 10)
+
+    def test_small_feeds_list_every_page(self):
+        page = Paginator(range(30), 10).page(2)
+        self.assertEqual(page_window(page), [1, 2, 3])
+
+    def test_long_feeds_elide_far_pages(self):
+        self.assertEqual(page_window(self.paginator.page(1)),
+                         [1, 2, 3, 4, None, 100])
+        self.assertEqual(page_window(self.paginator.page(50)),
+                         [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100])
+        self.assertEqual(page_window(self.paginator.page(96)),
+                         [1, None, 93, 94, 95, 96, 97, 98, 99, 100])
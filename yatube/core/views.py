@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +15,12 @@ def csrf_failure(request, reason=''):
 
 def error500(request, reason=''):
     return render(request, 'core/500.html')
+
+
+@staff_member_required
+def metrics_snapshot(request):
+    """Request metrics of this worker, Prometheus text or ?format=json"""
+    if request.GET.get('format') == 'json':
+        return JsonResponse(metrics.snapshot())
+    return HttpResponse(metrics.prometheus_text(),
+                        content_type='text/plain; version=0.0.4')
@@ -1,9 +1,27 @@
 from django.contrib import admin
 
+from core.admin import LargeTableAdmin, input_filter
+
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Admin search through the FTS index instead of LIKE '%term%'"""
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not search.is_supported():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        if not search.match_expression(search_term):
+            # Nothing but punctuation: MATCH '' is an FTS5 syntax error.
+            return queryset.none(), False
+        matches = search.matching_ids(self.search_index, search_term)
+        return queryset.filter(pk__in=matches), False
+
+
+class PostAdmin(FullTextSearchMixin, LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,26 +30,38 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author',)
     search_fields = ('text',)
-    list_filter = ('created',)
+    search_index = search.POST_INDEX
+    list_filter = ('created', input_filter('author__username', 'автору'))
     empty_value_display = '-пусто-'
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug')
+    search_fields = ('title', 'slug')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, LargeTableAdmin):
     list_display = ('post', 'author', 'text', 'created')
-    list_filter = ('post', 'author', 'text', 'created')
-    search_fields = ('post', 'author', 'text')
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    list_filter = ('created', input_filter('post', 'номеру поста'),
+                   input_filter('author__username', 'автору'))
+    search_fields = ('text',)
+    search_index = search.COMMENT_INDEX
     empty_value_display = '-пусто-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('user', 'author')
-    list_filter = ('user', 'author')
-    search_fields = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    list_filter = (input_filter('user__username', 'подписчику'),
+                   input_filter('author__username', 'автору'))
+    search_fields = ('=user__username', '=author__username')
+    search_related = {'user': 'username', 'author': 'username'}
     empty_value_display = '-пусто-'
 
 
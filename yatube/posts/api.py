@@ -0,0 +1,165 @@
+"""Read-only JSON API for the feeds and post pages.
+
+Every response is validated before anything is serialized: the page
+window is first read as bare (id, created, version, comments_count)
+rows, which is one indexed query. The ETag is a digest of those rows,
+and a client holding the current copy gets a 304 right there.
+Otherwise the full posts are loaded and the body is streamed out post
+by post. There is no Last-Modified: edits and comments bump version
+and comments_count, not created, so a date would miss them.
+
+Feeds use keyset pages only: pass back next_cursor as ?cursor=.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .comment_pages import comment_page
+from .group_pages import get_group
+from .models import Post, User
+from .query_budget import query_budget
+from .timeline import timeline_posts
+from .utils import CURSOR_PARAM, paginate_cursor
+
+MAX_LIMIT = 100
+WINDOW_FIELDS = ('pk', 'created', 'version', 'comments_count')
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.NMB_OF_ITEMS))
+    except ValueError:
+        return settings.NMB_OF_ITEMS
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': post.created,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+        'version': post.version,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': getattr(comment.author, 'username', None),
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def _etag(rows, extra):
+    """ETag of a list of window rows"""
+    digest = hashlib.md5(repr(extra).encode())
+    for row in rows:
+        digest.update(
+            f'{row.pk}:{row.version}:{row.comments_count};'.encode()
+        )
+    return quote_etag(digest.hexdigest())
+
+
+def _stream(results, meta):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '{"results": ['
+    for number, item in enumerate(results):
+        yield (',' if number else '') + encoder.encode(item)
+    yield ']'
+    for key, value in meta.items():
+        yield f', {json.dumps(key)}: {encoder.encode(value)}'
+    yield '}'
+
+
+def _respond(request, rows, extra, body):
+    """304 if the client's copy matches rows, else the streamed body()"""
+    etag = _etag(rows, extra)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(body(),
+                                         content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def _feed(request, posts, extra=None):
+    window = paginate_cursor(posts.only(*WINDOW_FIELDS),
+                             request.GET.get(CURSOR_PARAM), _limit(request))
+    meta = {
+        **(extra or {}),
+        'next_cursor': window.next_cursor,
+        'previous_cursor': window.previous_cursor,
+    }
+
+    def body():
+        by_pk = Post.objects.for_api().in_bulk(
+            [row.pk for row in window]
+        )
+        return _stream((serialize_post(by_pk[row.pk]) for row in window
+                        if row.pk in by_pk), meta)
+
+    return _respond(request, window.object_list,
+                    (extra, request.GET.get(CURSOR_PARAM)), body)
+
+
+@query_budget(2)
+def index(request):
+    """Index feed"""
+    return _feed(request, Post.objects.all())
+
+
+@query_budget(3)
+def group_posts(request, slug):
+    """Group feed"""
+    group = get_group(slug)
+    return _feed(request, Post.objects.filter(group=group), {'group': {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }})
+
+
+@query_budget(3)
+def profile(request, username):
+    """Author feed"""
+    author = get_object_or_404(User, username=username)
+    return _feed(request, Post.objects.filter(author=author), {'author': {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+    }})
+
+
+@query_budget(5)
+def follow_index(request):
+    """Feed of the followed authors"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication required'},
+                            status=401)
+    return _feed(request, timeline_posts(request.user))
+
+
+@query_budget(3)
+def post_detail(request, post_id):
+    """Post with the first page of its comments"""
+    post = get_object_or_404(Post.objects.for_api(), pk=post_id)
+
+    def body():
+        comments = comment_page(post.pk)
+        return _stream([serialize_post(post)], {
+            'comments': [serialize_comment(comment)
+                         for comment in comments],
+            'comments_next_cursor': comments.next_cursor,
+        })
+
+    return _respond(request, [post], None, body)
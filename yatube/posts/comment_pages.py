@@ -0,0 +1,31 @@
+"""Keyset pages of a post's comments, newest first.
+
+The first page is what almost every visitor sees, so it is cached per
+post and dropped whenever a comment on the post is added or removed.
+Further pages are loaded on demand with a cursor and are not cached.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Comment
+from .utils import paginate_cursor
+
+
+def _first_page_key(post_id):
+    return f'post-comments:{post_id}'
+
+
+def comment_page(post_id, token=None):
+    comments = Comment.objects.filter(post_id=post_id).for_post()
+    if token:
+        return paginate_cursor(comments, token, settings.COMMENTS_PER_PAGE)
+    key = _first_page_key(post_id)
+    page = cache.get(key)
+    if page is None:
+        page = paginate_cursor(comments, None, settings.COMMENTS_PER_PAGE)
+        cache.set(key, page, settings.COMMENTS_CACHE_TIMEOUT)
+    return page
+
+
+def invalidate(post_id):
+    cache.delete(_first_page_key(post_id))
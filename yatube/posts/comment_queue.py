@@ -0,0 +1,162 @@
+"""Write-behind path for comments, for bursts on popular posts.
+
+With COMMENT_WRITE_BEHIND on, add_comment validates the form and only
+queues the comment: a single flusher thread per process collects up to
+COMMENT_FLUSH_BATCH of them, or whatever arrived within
+COMMENT_FLUSH_INTERVAL seconds, and writes them with one bulk_create in
+a short transaction. On SQLite that turns a storm of single-row
+transactions fighting for the write lock into a few batched ones.
+
+bulk_create skips the Comment signals, so flush() does their work
+itself: comment counters, the cached first comment page and the search
+index.
+
+Until its comment is flushed the author still sees it: it is kept for
+COMMENT_PENDING_TIMEOUT seconds under the author's key in the cache,
+and with_pending() lays it over the first comment page of their own
+post_detail. Queued comments live in process memory; a worker that is
+killed before the next flush loses them, which is the price of the
+mode and why it is off by default.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import comment_pages, counters, search
+from .models import Comment, Post
+from .utils import CursorPage, assign_bulk_pks
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _pending_key(user_id):
+    return f'comment-pending:{user_id}'
+
+
+def _start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run, name='comment-flusher',
+                                        daemon=True)
+            _flusher.start()
+
+
+def enqueue(comment):
+    """Queue an unsaved comment and remember it for its author"""
+    comment.created = timezone.now()
+    key = _pending_key(comment.author_id)
+    horizon = comment.created - timedelta(
+        seconds=settings.COMMENT_PENDING_TIMEOUT)
+    pending = [entry for entry in cache.get(key, [])
+               if entry[2] > horizon]
+    pending.append((comment.post_id, comment.text, comment.created))
+    cache.set(key, pending, settings.COMMENT_PENDING_TIMEOUT)
+
+    def submit():
+        _queue.put(comment)
+        _start_flusher()
+
+    transaction.on_commit(submit)
+
+
+def next_batch(timeout=None):
+    """Block for one queued comment, then collect a batch behind it"""
+    batch = [_queue.get(timeout=timeout)]
+    deadline = time.monotonic() + settings.COMMENT_FLUSH_INTERVAL
+    while len(batch) < settings.COMMENT_FLUSH_BATCH:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run():
+    while True:
+        batch = next_batch()
+        for attempt in range(settings.COMMENT_FLUSH_ATTEMPTS):
+            try:
+                flush(batch)
+                break
+            except OperationalError:
+                # Most likely the write lock, held past the busy timeout.
+                time.sleep(settings.COMMENT_FLUSH_INTERVAL * 2 ** attempt)
+            except Exception:
+                logger.exception('Dropped a batch of %s comments',
+                                 len(batch))
+                break
+            finally:
+                close_old_connections()
+        else:
+            logger.error('Dropped a batch of %s comments after %s attempts',
+                         len(batch), settings.COMMENT_FLUSH_ATTEMPTS)
+
+
+def flush(comments):
+    """Write queued comments in one transaction, return how many landed"""
+    try:
+        with transaction.atomic():
+            live = set(Post.objects.filter(
+                pk__in={comment.post_id for comment in comments}
+            ).values_list('pk', flat=True))
+            written = [comment for comment in comments
+                       if comment.post_id in live]
+            Comment.objects.bulk_create(written)
+            assign_bulk_pks(written)
+            per_post = Counter(comment.post_id for comment in written)
+            for post_id, added in per_post.items():
+                counters.shift_comments(post_id, added)
+            for comment in written:
+                search.index_comment(comment)
+    except Exception:
+        # The rollback dropped the rows but not the ids they were
+        # given; a retry with them would insert explicit, stale ids.
+        for comment in comments:
+            comment.pk = None
+        raise
+    for post_id in per_post:
+        comment_pages.invalidate(post_id)
+    return len(written)
+
+
+def with_pending(page, post_id, user):
+    """The first comment page with the user's unflushed comments on top"""
+    if not settings.COMMENT_WRITE_BEHIND or not user.is_authenticated:
+        return page
+    pending = [entry for entry in cache.get(_pending_key(user.pk), [])
+               if entry[0] == post_id]
+    if not pending:
+        return page
+    # Flushed comments are on the page already, or older than all of it.
+    written = Counter(comment.text for comment in page
+                      if comment.author_id == user.pk)
+    oldest = page[-1].created if len(page) else None
+    overlay = []
+    for _, text, created in sorted(pending, key=itemgetter(2),
+                                   reverse=True):
+        if written[text]:
+            written[text] -= 1
+        elif oldest is None or created >= oldest or not page.has_next():
+            overlay.append(Comment(post_id=post_id, author=user, text=text,
+                                   created=created))
+    if not overlay:
+        return page
+    return CursorPage(overlay + list(page), page.has_next(),
+                      page.has_previous())
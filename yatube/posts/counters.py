@@ -0,0 +1,87 @@
+"""Denormalized post, comment and follow counters.
+
+The counters are shifted with F() expressions as rows are created and
+deleted, so concurrent requests never lose an increment; decrements
+stop at zero. Anything that bypasses model signals (bulk_create, raw
+SQL, fixtures) can leave them off; reconcile() recomputes the drifted
+rows in bulk.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+
+def _shifted(field, delta):
+    # Rows written by bulk_create were never counted, so deleting them
+    # must not take the counter below zero.
+    return Greatest(F(field) + delta, 0)
+
+
+def shift_author(user_id, field, delta):
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: _shifted(field, delta)}
+    )
+
+
+def shift_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta)
+    )
+
+
+def _count_of(queryset, outer_field, outer_ref='pk'):
+    """Correlated COUNT(*) of queryset rows grouped by outer_field"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{outer_field: OuterRef(outer_ref)})
+            .order_by()
+            .values(outer_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def _repair(queryset, counters):
+    """Rewrite the counters of the rows that drifted, return their number"""
+    actual = queryset.annotate(
+        **{f'actual_{field}': value for field, value in counters.items()}
+    )
+    drifted = actual.filter(
+        Q(*(~Q(**{field: F(f'actual_{field}')}) for field in counters),
+          _connector=Q.OR)
+    )
+    repaired = 0
+    last_pk = 0
+    # Keyset batches: SQLite must not write to a table it is iterating.
+    while True:
+        pks = list(drifted.filter(pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:500])
+        if not pks:
+            return repaired
+        queryset.filter(pk__in=pks).update(**counters)
+        repaired += len(pks)
+        last_pk = pks[-1]
+
+
+def reconcile():
+    """Recompute drifted counters, return the repaired rows per table"""
+    missing = User.objects.filter(stats__isnull=True).values_list('pk',
+                                                                  flat=True)
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    author_stats = _repair(AuthorStats.objects.all(), {
+        'posts_count': _count_of(Post.objects.all(), 'author', 'user'),
+        'followers_count': _count_of(Follow.objects.all(), 'author',
+                                     'user'),
+        'following_count': _count_of(Follow.objects.all(), 'user', 'user'),
+    })
+    posts = _repair(Post.objects.all(), {
+        'comments_count': _count_of(Comment.objects.all(), 'post'),
+    })
+    return {'author_stats': author_stats, 'posts': posts}
@@ -0,0 +1,83 @@
+"""Who a user follows, cached as a sorted array of author ids.
+
+Each reader's followees are stored under one key as the raw bytes of a
+sorted array('q'), eight bytes per author, so "do I follow X" and "which
+of these authors do I follow" are binary searches over a single cache
+read. The Follow signals patch the cached array in place on follow and
+unfollow instead of dropping it; a reader whose array is not cached is
+loaded with one indexed query on first use.
+
+Two follows by the same reader racing each other may lose one update;
+FOLLOW_GRAPH_CACHE_TIMEOUT bounds how long such a copy can live.
+"""
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+
+def _key(user_id):
+    return f'following:{user_id}'
+
+
+def _store(user_id, followees):
+    cache.set(_key(user_id), followees.tobytes(),
+              settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+
+
+def _cached(user_id):
+    raw = cache.get(_key(user_id))
+    if raw is None:
+        return None
+    followees = array('q')
+    followees.frombytes(raw)
+    return followees
+
+
+def _contains(followees, author_id):
+    position = bisect_left(followees, author_id)
+    return position < len(followees) and followees[position] == author_id
+
+
+def followee_ids(user_id):
+    """Sorted ids of the authors a user follows"""
+    followees = _cached(user_id)
+    if followees is None:
+        followees = array('q', Follow.objects.filter(user_id=user_id)
+                          .order_by('author_id')
+                          .values_list('author_id', flat=True))
+        _store(user_id, followees)
+    return followees
+
+
+def is_following(user_id, author_id):
+    return _contains(followee_ids(user_id), author_id)
+
+
+def following_many(user_id, author_ids):
+    """The subset of author_ids the user follows"""
+    followees = followee_ids(user_id)
+    return {author_id for author_id in author_ids
+            if _contains(followees, author_id)}
+
+
+def add(user_id, author_id):
+    followees = _cached(user_id)
+    if followees is not None and not _contains(followees, author_id):
+        insort(followees, author_id)
+        _store(user_id, followees)
+
+
+def remove(user_id, author_id):
+    followees = _cached(user_id)
+    if followees is not None and _contains(followees, author_id):
+        del followees[bisect_left(followees, author_id)]
+        _store(user_id, followees)
+
+
+def forget(user_id):
+    """Drop a cached array, e.g. after follows were written in bulk"""
+    cache.delete(_key(user_id))
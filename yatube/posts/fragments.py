@@ -0,0 +1,50 @@
+"""Render cache for the post card in includes/article.html.
+
+A card only depends on the post, its author and its group, so it is
+cached under the post id and Post.version. Editing a post, renaming its
+group or its author bumps the version and the old entry just expires.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+ARTICLE_TEMPLATE = 'includes/article.html'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def fragment_stats():
+    """Hit and miss counters of this process"""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def article_key(post, flags):
+    variant = '.'.join(sorted(name for name, on in flags.items() if on))
+    return f'article:{variant}:{post.pk}:{post.version}'
+
+
+def render_article(post, **flags):
+    key = article_key(post, flags)
+    html = cache.get(key)
+    if html is not None:
+        _count('hits')
+        return html
+    _count('misses')
+    html = render_to_string(ARTICLE_TEMPLATE, {'post': post, **flags})
+    cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return html
@@ -0,0 +1,125 @@
+"""Hot caches behind the group landing pages.
+
+A big group makes every rebuild of its first pages expensive: after
+each new post the page cache drops them, and building one again meant
+a COUNT(*) over all of the group's posts plus an OFFSET walk down its
+index. Three cache entries per group take that off the database:
+
+* the Group itself, by slug, so the page needs no lookup query;
+* the number of its posts, shifted by the Post signals whenever a post
+  joins or leaves the group and counted again only when evicted;
+* the ids of its first FEED_CACHE_PAGES pages, newest first, dropped
+  on the same events and reloaded with one LIMIT query on the
+  (group, created) index.
+
+Rebuilding a first page then costs one in_bulk() query for its posts.
+Deeper pages still read their rows with OFFSET, but use the cached
+count too.
+"""
+from array import array
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.http import Http404
+
+from .models import Group, Post
+from .page_cache import cached_page
+from .utils import (CURSOR_PARAM, numbered_page, page_number,
+                    paginate_cursor)
+
+
+def _group_key(slug):
+    # Slugs saved through the admin are not checked for spaces.
+    return f'group-by-slug:{quote(slug)}'
+
+
+def _count_key(group_id):
+    return f'group-posts-count:{group_id}'
+
+
+def _head_key(group_id):
+    return f'group-posts-head:{group_id}'
+
+
+def get_group(slug):
+    """The group with this slug, or Http404"""
+    group = cache.get(_group_key(slug))
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise Http404('No group matches the given query.')
+        cache.set(_group_key(slug), group, settings.GROUP_CACHE_TIMEOUT)
+    return group
+
+
+def post_count(group_id):
+    count = cache.get(_count_key(group_id))
+    if count is None:
+        count = Post.objects.filter(group_id=group_id).count()
+        cache.add(_count_key(group_id), count, settings.GROUP_CACHE_TIMEOUT)
+    return count
+
+
+def head_ids(group_id):
+    """Ids of the posts on the group's first FEED_CACHE_PAGES pages"""
+    raw = cache.get(_head_key(group_id))
+    ids = array('q')
+    if raw is not None:
+        ids.frombytes(raw)
+        return ids
+    size = settings.FEED_CACHE_PAGES * settings.NMB_OF_ITEMS
+    ids.extend(Post.objects.filter(group_id=group_id)
+               .order_by('-created', '-pk')
+               .values_list('pk', flat=True)[:size])
+    cache.set(_head_key(group_id), ids.tobytes(),
+              settings.GROUP_CACHE_TIMEOUT)
+    return ids
+
+
+def _shift(group_id, delta):
+    try:
+        cache.incr(_count_key(group_id), delta)
+    except ValueError:
+        # Not cached: post_count() counts it on the next read.
+        pass
+    cache.delete(_head_key(group_id))
+
+
+def post_joined(group_id):
+    _shift(group_id, 1)
+
+
+def post_left(group_id):
+    _shift(group_id, -1)
+
+
+def forget_group(group_id, *slugs):
+    """Drop everything cached for a group, e.g. once it is changed"""
+    cache.delete_many([_count_key(group_id), _head_key(group_id)]
+                      + [_group_key(slug) for slug in slugs if slug])
+
+
+def group_page(group, request):
+    """A page of the group feed, the first ones served from the caches"""
+    posts = group.group_posts.for_feed()
+    if CURSOR_PARAM in request.GET:
+        return paginate_cursor(posts, request.GET.get(CURSOR_PARAM))
+    paginator = Paginator(posts, settings.NMB_OF_ITEMS)
+    paginator.count = post_count(group.pk)
+    requested = page_number(request)
+    if requested > settings.FEED_CACHE_PAGES:
+        return numbered_page(paginator, requested)
+    requested = min(requested, paginator.num_pages)
+
+    def build():
+        bottom = (requested - 1) * paginator.per_page
+        ids = head_ids(group.pk)[bottom:bottom + paginator.per_page]
+        by_pk = Post.objects.for_feed().in_bulk(list(ids))
+        return (requested, [by_pk[pk] for pk in ids if pk in by_pk],
+                paginator.count)
+
+    number, object_list, _ = cached_page(f'group:{group.pk}', requested,
+                                         build)
+    return Page(object_list, number, paginator)
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import cycle, islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from yatube.asgi import WSGIAdapter
+
+from .benchmark_views import WSGIHarness, percentile
+
+VIEWS = ['index', 'group_list', 'profile', 'post_detail']
+
+
+class Command(BaseCommand):
+    help = ('Compare feed throughput under many concurrent requests: '
+            'threaded WSGI, the ASGI adapter, and the ASGI adapter with '
+            'concurrent feed queries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=VIEWS,
+            help='Feed views to spread the requests over',
+        )
+        parser.add_argument(
+            '--query-workers', type=int, default=8,
+            help='FEED_QUERY_WORKERS for the concurrent-queries run',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Bypass the feed page cache so every request queries',
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Milliseconds added to every query, the round trip a '
+                 'networked database would cost',
+        )
+
+    def handle(self, *args, **options):
+        if options['db_latency']:
+            self.add_latency(options['db_latency'] / 1000)
+        post = Post.objects.order_by('-comments_count', '-pk').first()
+        if post is None:
+            raise CommandError('Nothing to benchmark, run seed_social')
+        group = Group.objects.annotate(
+            total=Count('group_posts')).order_by('-total').first()
+        reader = User.objects.exclude(pk=post.author_id).order_by(
+            '-stats__following_count', 'pk').first() or post.author
+        client = Client()
+        client.force_login(reader)
+        cookie = '; '.join(f'{name}={morsel.value}'
+                           for name, morsel in client.cookies.items())
+        args = {
+            'index': [],
+            'profile': [post.author.username],
+            'post_detail': [post.pk],
+            'group_list': [group.slug if group else 'missing'],
+        }
+        paths = [reverse(f'posts:{view}', args=args[view])
+                 for view in options['views']]
+        paths = list(islice(cycle(paths), options['requests']))
+
+        runs = (
+            ('wsgi threads', self.run_wsgi, 0),
+            ('asgi', self.run_asgi, 0),
+            ('asgi + concurrent queries', self.run_asgi,
+             options['query_workers']),
+        )
+        for name, run, workers in runs:
+            with ExitStack() as stack:
+                stack.enter_context(
+                    override_settings(FEED_QUERY_WORKERS=workers))
+                if options['cold']:
+                    stack.enter_context(
+                        override_settings(FEED_CACHE_PAGES=0))
+                cache.clear()
+                run(paths[:options['concurrency']], cookie, options)
+                started = time.perf_counter()
+                results = run(paths, cookie, options)
+                elapsed = time.perf_counter() - started
+            self.report(name, results, elapsed)
+
+    @staticmethod
+    def add_latency(seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        connection_created.connect(install, weak=False)
+        connections.close_all()
+
+    def run_wsgi(self, paths, cookie, options):
+        harness = WSGIHarness({})
+        harness.cookie = cookie
+
+        def send(path):
+            started = time.perf_counter()
+            status = harness.get(path)
+            return status, time.perf_counter() - started
+
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            return list(executor.map(send, paths))
+
+    def run_asgi(self, paths, cookie, options):
+        application = WSGIAdapter(get_wsgi_application(),
+                                  options['concurrency'])
+
+        async def send(path, slots):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http',
+                'http_version': '1.1',
+                'method': 'GET',
+                'path': path,
+                'query_string': query.encode(),
+                'headers': [(b'host', b'testserver'),
+                            (b'cookie', cookie.encode())],
+            }
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def collect(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with slots:
+                started = time.perf_counter()
+                await application(scope, receive, collect)
+                return statuses[0], time.perf_counter() - started
+
+        async def main():
+            slots = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(send(path, slots)
+                                          for path in paths))
+
+        try:
+            return asyncio.run(main())
+        finally:
+            application.executor.shutdown()
+
+    def report(self, name, results, elapsed):
+        failed = sum(status != 200 for status, _ in results)
+        latencies = [seconds * 1000 for _, seconds in results]
+        self.stdout.write(
+            f'{name:<28} {len(results) / elapsed:8.1f} req/s  '
+            f'p50 {percentile(latencies, 50):7.1f} ms  '
+            f'p95 {percentile(latencies, 95):7.1f} ms  '
+            f'p99 {percentile(latencies, 99):7.1f} ms'
+            + (f'  {failed} failed' if failed else '')
+        )
@@ -0,0 +1,111 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.group_pages import group_page
+from posts.management.commands.benchmark_views import (BENCH_PREFIX,
+                                                       QueryCounter,
+                                                       benchmark_database,
+                                                       percentile)
+from posts.management.commands.seed_social import explicit_created
+from posts.models import Group, Post, User
+from posts.utils import paginate_page
+
+
+class Command(BaseCommand):
+    help = ('Seed one group with a large number of posts and time its '
+            'landing pages right after a new post, through the generic '
+            'feed page cache and through posts.group_pages')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument(
+            '--configured-database', action='store_true',
+            help='Seed the configured database instead of a test database '
+                 'and delete the group, its author and posts afterwards',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        with benchmark_database(options['configured_database'],
+                                options['verbosity']):
+            self.run(options)
+
+    def run(self, options):
+        group = self.seed(options['posts'], options['batch_size'])
+        author = group.group_posts.order_by('pk').first().author
+        factory = RequestFactory()
+        deep = max(settings.FEED_CACHE_PAGES + 1,
+                   options['posts'] // settings.NMB_OF_ITEMS // 2)
+        paginators = {
+            'paginate_page': lambda request: paginate_page(
+                group.group_posts.for_feed(), request,
+                cache_scope=f'group:{group.pk}'),
+            'group_page': lambda request: group_page(group, request),
+        }
+        cache.clear()
+        for page in (1, 2, deep):
+            request = factory.get('/', {'page': page})
+            for name, paginate in paginators.items():
+                result = self.measure(group, author, request, paginate,
+                                      options['iterations'])
+                self.stdout.write(
+                    f'{name:<14} page {page:<7} after a new post: '
+                    f'p50 {result["p50"]:8.2f} ms  '
+                    f'p95 {result["p95"]:8.2f} ms  '
+                    f'{result["queries"]} queries'
+                )
+
+    def seed(self, total, batch_size):
+        group, _ = Group.objects.get_or_create(
+            slug=f'{BENCH_PREFIX}-big-group',
+            defaults={'title': 'Big group', 'description': 'Benchmark'},
+        )
+        author, _ = User.objects.get_or_create(
+            username=f'{BENCH_PREFIX}-group-author')
+        missing = total - group.group_posts.count()
+        now = timezone.now()
+        with explicit_created(Post):
+            for start in range(0, max(missing, 0), batch_size):
+                size = min(batch_size, missing - start)
+                with transaction.atomic():
+                    Post.objects.bulk_create(
+                        Post(text=f'Group post {start + number}',
+                             author=author, group=group,
+                             created=now - timedelta(
+                                 seconds=missing - start - number))
+                        for number in range(size)
+                    )
+                reset_queries()
+                self.stdout.write(f'posts: {start + size}/{missing}',
+                                  ending='\r')
+        self.stdout.write('')
+        return group
+
+    def measure(self, group, author, request, paginate, iterations):
+        """Time the page right after a post joins the group"""
+        timings = []
+        queries = 0
+        for _ in range(iterations):
+            Post.objects.create(text='Fresh group post', author=author,
+                                group=group)
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                list(paginate(request))
+            timings.append(time.perf_counter() - started)
+            queries = max(queries, counter.count)
+        return {
+            'p50': percentile(timings, 50) * 1000,
+            'p95': percentile(timings, 95) * 1000,
+            'queries': queries,
+        }
@@ -0,0 +1,351 @@
+import json
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Comment, Group, Post, User
+
+BENCH_PREFIX = 'bench'
+BENCH_COMMENT = 'Benchmark comment'
+
+
+def remove_bench_rows():
+    """Delete the comments, users and groups the benchmarks created"""
+    Comment.objects.filter(text=BENCH_COMMENT).delete()
+    User.objects.filter(username__startswith=f'{BENCH_PREFIX}-').delete()
+    Group.objects.filter(slug__startswith=f'{BENCH_PREFIX}-').delete()
+
+
+@contextmanager
+def benchmark_database(configured=False, verbosity=1):
+    """Run a benchmark against a throwaway test database.
+
+    Seeded rows, comments and follows then never reach the configured
+    database, and cache keys get their own prefix so pages built from
+    the test rows cannot be served to the site. With configured=True
+    the configured database is used as is and the rows the scenarios
+    created are deleted afterwards.
+    """
+    if configured:
+        try:
+            yield
+        finally:
+            remove_bench_rows()
+        return
+    caches = {alias: {**config, 'KEY_PREFIX': BENCH_PREFIX}
+              for alias, config in settings.CACHES.items()}
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class WSGIHarness:
+    """Calls the WSGI application directly, the way a server would.
+
+    Unlike the test client it skips request factories and signal
+    bookkeeping, so the numbers are closer to what gunicorn sees. Only
+    GET requests go through it: there is no CSRF token to send.
+    """
+
+    def __init__(self, cookies):
+        self.application = get_wsgi_application()
+        self.cookie = '; '.join(
+            f'{name}={morsel.value}' for name, morsel in cookies.items()
+        )
+
+    def get(self, path):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'testserver',
+            'HTTP_COOKIE': self.cookie,
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        status = []
+
+        def start_response(line, headers, exc_info=None):
+            status.append(int(line.split()[0]))
+
+        body = self.application(environ, start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return status[0]
+
+
+class Command(BaseCommand):
+    help = ('Seed a large dataset into a throwaway database, drive every '
+            'posts URL through the test client and a WSGI harness and '
+            'report latency percentiles, queries and allocations per view')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request',
+        )
+        parser.add_argument('--seed-users', type=int, default=0)
+        parser.add_argument('--seed-posts', type=int, default=0)
+        parser.add_argument('--seed-follows', type=int, default=0)
+        parser.add_argument('--seed-comments', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--configured-database', action='store_true',
+            help='Benchmark the data already in the configured database '
+                 'instead of a seeded test database',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON file with earlier results to compare against',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Write the results to --baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed relative slowdown before a view counts as a '
+                 'regression',
+        )
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline PATH')
+        if options['configured_database'] and options['seed_posts']:
+            raise CommandError(
+                'Seeded rows cannot be told apart from real ones, drop '
+                '--configured-database to seed a test database'
+            )
+        with benchmark_database(options['configured_database'],
+                                options['verbosity']):
+            results = self.run(options)
+
+        if options['baseline'] and options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline:
+                json.dump(results, baseline, indent=2, sort_keys=True)
+            self.stdout.write(f'Baseline written to {options["baseline"]}')
+        elif options['baseline']:
+            self.compare(results, options)
+
+    def run(self, options):
+        if options['seed_posts']:
+            self.seed(options)
+        if not Post.objects.exists():
+            raise CommandError('Nothing to benchmark, pass --seed-posts')
+        results = {}
+        for name, send in self.scenarios():
+            results[name] = self.measure(send, options)
+            self.report(name, results[name])
+        return results
+
+    def seed(self, options):
+        call_command(
+            'seed_social',
+            users=options['seed_users'],
+            groups=10,
+            posts=options['seed_posts'],
+            comments=options['seed_comments'],
+            follows=options['seed_follows'],
+            batch_size=options['batch_size'],
+            prefix=BENCH_PREFIX,
+            stdout=self.stdout,
+        )
+
+    def scenarios(self):
+        """(name, send) pairs covering every route of posts.urls"""
+        group = Group.objects.annotate(
+            total=Count('group_posts')).order_by('-total').first()
+        post = Post.objects.order_by('-comments_count', '-pk').first()
+        author = post.author
+        reader = (User.objects.exclude(pk=author.pk)
+                  .order_by('-stats__following_count', 'pk').first()
+                  or User.objects.create(username=f'{BENCH_PREFIX}-reader'))
+        target = (User.objects.exclude(pk=reader.pk)
+                  .exclude(following__user=reader).order_by('pk').first()
+                  or User.objects.create(username=f'{BENCH_PREFIX}-target'))
+        staff, _ = User.objects.get_or_create(
+            username=f'{BENCH_PREFIX}-staff', defaults={'is_staff': True}
+        )
+        clients = {}
+        for role, user in (('reader', reader), ('author', author),
+                           ('staff', staff)):
+            clients[role] = Client()
+            clients[role].force_login(user)
+        post_id = {'post_id': post.pk}
+        target_name = {'username': target.username}
+        routes = {
+            'index': ('reader', 'get', {}, None),
+            'follow_index': ('reader', 'get', {}, None),
+            'trending': ('reader', 'get', {}, None),
+            'group_list': ('reader', 'get',
+                           {'slug': group.slug if group else 'missing'},
+                           None),
+            'post_create': ('author', 'get', {}, None),
+            'post_detail': ('reader', 'get', post_id, None),
+            'post_edit': ('author', 'get', post_id, None),
+            'add_comment': ('reader', 'post', post_id,
+                            {'text': BENCH_COMMENT}),
+            'post_comments': ('reader', 'get', post_id, None),
+            'profile': ('reader', 'get', {'username': author.username},
+                        None),
+            'profile_follow': ('reader', 'get', target_name, None),
+            'profile_unfollow': ('reader', 'get', target_name, None),
+            'search': ('reader', 'get', {},
+                       {'q': ' '.join(post.text.split()[:2])}),
+            'fragment_cache_stats': ('staff', 'get', {}, None),
+            'api_index': ('reader', 'get', {}, None),
+            'api_post_detail': ('reader', 'get', post_id, None),
+            'api_follow_index': ('reader', 'get', {}, None),
+            'api_group_list': ('reader', 'get',
+                               {'slug': group.slug if group else 'missing'},
+                               None),
+            'api_profile': ('reader', 'get', {'username': author.username},
+                            None),
+        }
+        missing = [pattern.name for pattern in urls.urlpatterns
+                   if pattern.name not in routes]
+        if missing:
+            raise CommandError(
+                f'No benchmark scenario for {", ".join(missing)}'
+            )
+        harnesses = {role: WSGIHarness(client.cookies)
+                     for role, client in clients.items()}
+        for name, (role, method, kwargs, data) in routes.items():
+            url = reverse(f'posts:{name}', kwargs=kwargs)
+            if method == 'get' and data:
+                url = f'{url}?{urlencode(data)}'
+            client = clients[role]
+            if method == 'post':
+                yield f'client {name}', (
+                    lambda url=url, client=client, data=data:
+                    client.post(url, data).status_code
+                )
+                continue
+            yield f'client {name}', (
+                lambda url=url, client=client: client.get(url).status_code
+            )
+            yield f'wsgi {name}', (
+                lambda url=url, harness=harnesses[role]: harness.get(url)
+            )
+
+    def measure(self, send, options):
+        def request():
+            if options['cold']:
+                cache.clear()
+            status = send()
+            if status not in (200, 302):
+                raise CommandError(f'Got HTTP {status}')
+            return status
+
+        for _ in range(options['warmup']):
+            request()
+        timings = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            request()
+            timings.append(time.perf_counter() - started)
+        # Queries and allocations are taken on a separate request, so
+        # tracing overhead does not leak into the latency numbers.
+        counter = QueryCounter()
+        tracemalloc.start()
+        try:
+            with connection.execute_wrapper(counter):
+                request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50': percentile(timings, 50) * 1000,
+            'p95': percentile(timings, 95) * 1000,
+            'p99': percentile(timings, 99) * 1000,
+            'queries': counter.count,
+            'alloc_kib': peak / 1024,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<30} p50 {result["p50"]:7.2f} ms  '
+            f'p95 {result["p95"]:7.2f} ms  p99 {result["p99"]:7.2f} ms  '
+            f'{result["queries"]:3d} queries  '
+            f'{result["alloc_kib"]:8.1f} KiB'
+        )
+
+    def compare(self, results, options):
+        with open(options['baseline']) as baseline:
+            baseline = json.load(baseline)
+        slack = 1 + options['tolerance']
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result['p95'] > before['p95'] * slack:
+                regressions.append(
+                    f'{name}: p95 {before["p95"]:.2f} -> '
+                    f'{result["p95"]:.2f} ms'
+                )
+            if result['queries'] > before['queries']:
+                regressions.append(
+                    f'{name}: {before["queries"]} -> '
+                    f'{result["queries"]} queries'
+                )
+            if result['alloc_kib'] > before['alloc_kib'] * slack:
+                regressions.append(
+                    f'{name}: {before["alloc_kib"]:.1f} -> '
+                    f'{result["alloc_kib"]:.1f} KiB allocated'
+                )
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions'))
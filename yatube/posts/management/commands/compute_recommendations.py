@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import compute
+
+
+class Command(BaseCommand):
+    help = 'Recompute who-to-follow suggestions from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int)
+        parser.add_argument(
+            '--max-cofollowers', type=int,
+            help='Followers per author looked at for co-follow scores',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = compute(options['top_k'], options['max_cofollowers'])
+        self.stdout.write(
+            f'{written} suggestions written in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import timeline_posts
+
+User = get_user_model()
+
+FULL_SCAN_MARKERS = ('Seq Scan',)
+SORT_MARKERS = ('USE TEMP B-TREE', 'Sort Method')
+
+
+def is_full_scan(line):
+    """SQLite says "SCAN table" without "USING", Postgres "Seq Scan" """
+    if any(marker in line for marker in FULL_SCAN_MARKERS):
+        return True
+    return ' SCAN ' in f' {line}' and 'USING' not in line
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the queries behind every feed view'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Fail if any query falls back to a full table scan',
+        )
+
+    def feed_queries(self):
+        user = User.objects.order_by('pk').first() or User(pk=1)
+        other = User.objects.exclude(pk=user.pk).first() or User(pk=2)
+        group = Group.objects.first() or Group(pk=1, slug='slug')
+        post = Post.objects.first() or Post(pk=1)
+        now = timezone.now()
+        feed = Post.objects.select_related('author', 'group')
+        queries = {
+            'index': feed.all(),
+            'index (cursor)': feed.filter(
+                Q(created__lt=now) | Q(created=now, pk__lt=post.pk),
+                created__lte=now,
+            ).order_by('-created', '-pk'),
+            'group_posts: group': Group.objects.filter(slug=group.slug),
+            'group_posts': group.group_posts.select_related('author'),
+            'profile: author': User.objects.filter(username=user.username),
+            'profile': user.author_posts.select_related('group'),
+            'profile: following': Follow.objects.filter(author=other,
+                                                        user=user),
+            'post_detail': feed.filter(pk=post.pk),
+            'post_detail: comments': Comment.objects.filter(post=post),
+            'follow_index': timeline_posts(user).select_related('author',
+                                                                'group'),
+        }
+        for name, queryset in queries.items():
+            yield name, queryset[:10]
+
+    def handle(self, *args, **options):
+        full_scans = []
+        for name, queryset in self.feed_queries():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                if is_full_scan(line):
+                    full_scans.append(name)
+                    self.stdout.write(self.style.ERROR(f'  {line}'))
+                elif any(marker in line for marker in SORT_MARKERS):
+                    self.stdout.write(self.style.WARNING(f'  {line}'))
+                else:
+                    self.stdout.write(f'  {line}')
+        if full_scans and options['strict']:
+            raise CommandError(
+                'Full table scans in: ' + ', '.join(sorted(set(full_scans)))
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(set(full_scans))} feed queries fall back to a full scan'
+        ))
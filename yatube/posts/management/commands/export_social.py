@@ -0,0 +1,84 @@
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+
+from posts.models import Post
+from posts.snapshot import FORMATS, MEDIA_DIR, TABLES, attnames, write_rows
+
+
+class Command(BaseCommand):
+    help = ('Stream users, groups, posts, comments, follows and post '
+            'images into a snapshot directory for import_social')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--skip-media', action='store_true',
+            help='Leave the image files out, keep only their names',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        # One read transaction for all tables: a comment written between
+        # the posts and the comments pass must not reference a post the
+        # snapshot lacks. SQLite outside WAL mode (DB_PROFILE=production)
+        # makes writers wait for the export meanwhile.
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL '
+                                   'REPEATABLE READ READ ONLY')
+            for name, model, columns in TABLES:
+                self.export_table(directory, name, model, columns, options)
+            if not options['skip_media']:
+                copied = self.copy_media(directory, options['chunk_size'])
+                self.stdout.write(f'media: {copied} files')
+        self.stdout.write(self.style.SUCCESS(f'Exported to {directory}'))
+
+    def export_table(self, directory, name, model, columns, options):
+        path = os.path.join(directory, f'{name}.{options["format"]}')
+        rows = (
+            model.objects.order_by('pk')
+            .values_list(*attnames(model, columns))
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            written = write_rows(stream, options['format'], columns,
+                                 self.forgetting_queries(rows))
+        self.stdout.write(f'{name}: {written} rows')
+
+    def forgetting_queries(self, rows):
+        # With DEBUG on every chunk fetched would stay in
+        # connection.queries for the whole export.
+        for number, row in enumerate(rows, 1):
+            if number % 10000 == 0:
+                reset_queries()
+            yield row
+
+    def copy_media(self, directory, chunk_size):
+        names = (
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct()
+            .iterator(chunk_size=chunk_size)
+        )
+        copied = 0
+        for name in names:
+            target = os.path.join(directory, MEDIA_DIR, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                source = default_storage.open(name, 'rb')
+            except FileNotFoundError:
+                self.stderr.write(f'Missing image file {name}, skipped')
+                continue
+            with source, open(target, 'wb') as copy:
+                shutil.copyfileobj(source, copy)
+            copied += 1
+        return copied
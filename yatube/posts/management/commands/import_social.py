@@ -0,0 +1,167 @@
+import os
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+
+from posts import search, timeline
+from posts.counters import reconcile
+from posts.management.commands.seed_social import explicit_created
+from posts.models import Comment, Follow, Group, Post, User
+from posts.snapshot import FORMATS, MEDIA_DIR, TABLES, IdMap, read_rows
+from posts.utils import assign_bulk_pks, batches
+
+
+class Command(BaseCommand):
+    help = ('Load a snapshot written by export_social. Users and groups '
+            'that already exist (same username or slug) are reused, '
+            'everything else is added. Each batch commits on its own: '
+            'an import that fails halfway leaves the earlier batches in')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Leave follow feeds as they are instead of rebuilding them',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.directory = options['directory']
+        if not os.path.isdir(self.directory):
+            raise CommandError(f'No snapshot at {self.directory}')
+        self.batch_size = options['batch_size']
+        self.ids = {User: IdMap(), Group: IdMap(), Post: IdMap()}
+        loaders = {
+            'users': self.load_users,
+            'groups': self.load_groups,
+            'posts': self.load_posts,
+            'comments': self.load_comments,
+            'follows': self.load_follows,
+        }
+        with explicit_created(Post, Comment):
+            for name, model, columns in TABLES:
+                path = os.path.join(self.directory,
+                                    f'{name}.{options["format"]}')
+                if not os.path.exists(path):
+                    self.stdout.write(f'{name}: no {path}, skipped')
+                    continue
+                with open(path, encoding='utf-8', newline='') as stream:
+                    rows = read_rows(stream, options['format'], model,
+                                     columns)
+                    loaded = 0
+                    for batch in batches(rows, self.batch_size):
+                        with transaction.atomic():
+                            loaded += loaders[name](batch)
+                        reset_queries()
+                self.stdout.write(f'{name}: {loaded} rows')
+
+        # bulk_create skips the signals that keep derived data in sync;
+        # the search index is written batch by batch above.
+        for table, repaired in reconcile().items():
+            self.stdout.write(f'{table}: {repaired} counters recomputed')
+        if not options['skip_timelines']:
+            rebuilt = timeline.rebuild_all()
+            self.stdout.write(f'{rebuilt} follow feeds rebuilt')
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def target_id(self, model, row, column):
+        source_id = row[column]
+        if source_id is None:
+            return None
+        target_id = self.ids[model].get(source_id)
+        if target_id is None:
+            raise CommandError(
+                f'Row {row.get("id")} points to {column} {source_id}, '
+                f'which is not in the snapshot'
+            )
+        return target_id
+
+    def load_by_key(self, model, batch, key):
+        """Reuse rows matching on a unique key, insert the rest"""
+        existing = dict(
+            model.objects.filter(**{f'{key}__in': [row[key]
+                                                   for row in batch]})
+            .values_list(key, 'pk')
+        )
+        created = [model(**{column: value for column, value in row.items()
+                            if column != 'id'})
+                   for row in batch if row[key] not in existing]
+        model.objects.bulk_create(created)
+        assign_bulk_pks(created)
+        existing.update((getattr(instance, key), instance.pk)
+                        for instance in created)
+        for row in batch:
+            self.ids[model].add(row['id'], existing[row[key]])
+        return len(batch)
+
+    def load_users(self, batch):
+        return self.load_by_key(User, batch, 'username')
+
+    def load_groups(self, batch):
+        return self.load_by_key(Group, batch, 'slug')
+
+    def load_posts(self, batch):
+        posts = [
+            Post(
+                author_id=self.target_id(User, row, 'author'),
+                group_id=self.target_id(Group, row, 'group'),
+                text=row['text'],
+                created=row['created'],
+                image=self.copy_image(row['image']),
+            )
+            for row in batch
+        ]
+        Post.objects.bulk_create(posts)
+        assign_bulk_pks(posts)
+        for row, post in zip(batch, posts):
+            self.ids[Post].add(row['id'], post.pk)
+            search.index_post(post)
+        return len(batch)
+
+    def load_comments(self, batch):
+        comments = [
+            Comment(
+                post_id=self.target_id(Post, row, 'post'),
+                author_id=self.target_id(User, row, 'author'),
+                text=row['text'],
+                created=row['created'],
+            )
+            for row in batch
+        ]
+        Comment.objects.bulk_create(comments)
+        assign_bulk_pks(comments)
+        for comment in comments:
+            search.index_comment(comment)
+        return len(batch)
+
+    def load_follows(self, batch):
+        # Pairs the target already has are dropped by the constraint.
+        Follow.objects.bulk_create(
+            [Follow(user_id=self.target_id(User, row, 'user'),
+                    author_id=self.target_id(User, row, 'author'))
+             for row in batch],
+            ignore_conflicts=True,
+        )
+        return len(batch)
+
+    def copy_image(self, name):
+        """Store a snapshot image, return the name it was saved under"""
+        if not name:
+            return name
+        media = os.path.realpath(os.path.join(self.directory, MEDIA_DIR))
+        path = os.path.realpath(os.path.join(media, name))
+        if not path.startswith(media + os.sep):
+            raise CommandError(f'Image name {name} leaves the snapshot')
+        if not os.path.exists(path):
+            # Exported with --skip-media: the file is expected to be in
+            # the target storage already.
+            return name
+        with open(path, 'rb') as image:
+            return default_storage.save(name, File(image))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = ('Recompute post, comment and follow counters that drifted, '
+            'then push the posts of authors who fell below '
+            'TIMELINE_FANOUT_LIMIT')
+
+    def handle(self, *args, **options):
+        for table, repaired in reconcile().items():
+            self.stdout.write(f'{table}: {repaired} rows repaired')
+        demoted = timeline.demote_pending()
+        self.stdout.write(f'timelines: {demoted} authors pushed again')
@@ -0,0 +1,203 @@
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import search, timeline
+from posts.counters import reconcile
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import batches
+
+
+def power_law_rank(rng, size, skew):
+    """Rank in [0, size) drawn with weight 1 / (rank + 1) ** skew.
+
+    Inverts the CDF of the continuous distribution instead of building
+    a weight table, so drawing from millions of rows takes no memory.
+    """
+    if skew == 1:
+        value = (size + 1) ** rng.random()
+    else:
+        span = (size + 1) ** (1 - skew) - 1
+        value = (span * rng.random() + 1) ** (1 / (1 - skew))
+    return min(int(value) - 1, size - 1)
+
+
+def id_array(queryset):
+    """Primary keys packed 8 bytes apiece, instead of a list of ints"""
+    ids = array('q')
+    ids.extend(queryset.values_list('pk', flat=True).iterator())
+    return ids
+
+
+@contextmanager
+def explicit_created(*models):
+    """Let bulk_create keep the spread-out timestamps it is given"""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Generate users, groups, posts, comments and a follow graph '
+            'with power-law popularity for scale testing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Power-law exponent of author and post popularity',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Spread post and comment dates over this many days',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Leave follow feeds empty instead of rebuilding them',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.rng = random.Random(options['random_seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days'])
+
+        self.create_users(options['users'], options['prefix'])
+        self.create_groups(options['groups'], options['prefix'])
+        user_ids = id_array(User.objects.order_by('pk'))
+        if not user_ids:
+            raise CommandError('There are no users to write posts')
+        with explicit_created(Post, Comment):
+            self.create_posts(options['posts'], user_ids)
+            post_ids = id_array(Post.objects.order_by('-pk'))
+            self.create_comments(options['comments'], user_ids, post_ids)
+        del post_ids
+        self.create_follows(options['follows'], user_ids)
+
+        # bulk_create skips the signals that keep derived data in sync.
+        for table, repaired in reconcile().items():
+            self.stdout.write(f'{table}: {repaired} counters recomputed')
+        with transaction.atomic():
+            search.rebuild_index()
+        reset_queries()
+        if not options['skip_timelines']:
+            self.rebuild_timelines()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def rebuild_timelines(self):
+        rebuilt = timeline.rebuild_all()
+        self.stdout.write(f'{rebuilt} follow feeds rebuilt')
+
+    def insert(self, model, rows, total, **kwargs):
+        for done, batch in enumerate(batches(rows, self.batch_size), 1):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            # With DEBUG on every multi-row INSERT is kept in
+            # connection.queries, which alone would exhaust memory.
+            reset_queries()
+            written = min(done * self.batch_size, total)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {written}/{total}',
+                ending='\r',
+            )
+        self.stdout.write('')
+
+    def created_at(self, position, total):
+        """Dates grow with the row id, ending at the present"""
+        age = self.span * (1 - position / max(total, 1))
+        return self.now - age - timedelta(seconds=self.rng.random() * 60)
+
+    def create_users(self, total, prefix):
+        start = (User.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        self.insert(User, (
+            User(username=f'{prefix}{number}', password='!')
+            for number in range(start, start + total)
+        ), total)
+
+    def create_groups(self, total, prefix):
+        start = (Group.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        self.insert(Group, (
+            Group(title=f'Group {number}', slug=f'{prefix}-{number}',
+                  description=f'Generated group {number}')
+            for number in range(start, start + total)
+        ), total)
+
+    def create_posts(self, total, user_ids):
+        group_ids = id_array(Group.objects.all())
+        rows = (
+            Post(
+                text=f'Generated post {number}',
+                author_id=user_ids[
+                    power_law_rank(self.rng, len(user_ids), self.skew)],
+                group_id=(self.rng.choice(group_ids)
+                          if group_ids and self.rng.random() < 0.7
+                          else None),
+                created=self.created_at(number, total),
+            )
+            for number in range(total)
+        )
+        self.insert(Post, rows, total)
+
+    def create_comments(self, total, user_ids, post_ids):
+        """Newest posts draw the most comments, old ones a long tail"""
+        if not post_ids:
+            return
+        rows = (
+            Comment(
+                text=f'Generated comment {number}',
+                post_id=post_ids[
+                    power_law_rank(self.rng, len(post_ids), self.skew)],
+                author_id=self.rng.choice(user_ids),
+                created=self.created_at(number, total),
+            )
+            for number in range(total)
+        )
+        self.insert(Comment, rows, total)
+
+    def follow_pairs(self, total, user_ids):
+        """Each user follows a few authors, mostly the popular ones"""
+        if not total or len(user_ids) < 2:
+            return
+        mean = max(total / len(user_ids), 1)
+        emitted = 0
+        while True:
+            for user_id in user_ids:
+                authors = set()
+                for _ in range(round(self.rng.expovariate(1 / mean))):
+                    authors.add(user_ids[power_law_rank(
+                        self.rng, len(user_ids), self.skew)])
+                authors.discard(user_id)
+                for author_id in authors:
+                    if emitted == total:
+                        return
+                    emitted += 1
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+    def create_follows(self, total, user_ids):
+        # Later passes over the users may repeat a pair, which the
+        # unique constraint drops.
+        self.insert(Follow, self.follow_pairs(total, user_ids), total,
+                    ignore_conflicts=True)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import update
+
+
+class Command(BaseCommand):
+    help = 'Fold new comments and follower counts into the trending feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep running, updating every INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            processed = update(options['batch_size'])
+            if processed is None:
+                self.stderr.write('Another update is running')
+            else:
+                self.stdout.write(
+                    f'{processed} comments folded in '
+                    f'{time.perf_counter() - started:.2f}s'
+                )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
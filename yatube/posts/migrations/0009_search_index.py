@@ -0,0 +1,98 @@
+import re
+from itertools import islice
+
+from django.db import migrations
+
+# The normalisation of posts.search as of this migration, frozen here
+# so later changes to the module cannot alter what it does.
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+REFLEXIVE = ('ся', 'сь')
+ENDINGS = sorted((
+    # adjectives and participles
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+    # verbs
+    'ла', 'на', 'ете', 'йте', 'ли', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+    'ешь', 'нно', 'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или',
+    'ыли', 'ил', 'ыл', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит',
+    'ыт', 'ены', 'ить', 'ыть', 'ишь',
+    # nouns
+    'а', 'ев', 'ов', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'иям', 'ям', 'ием', 'ам', 'о', 'у', 'ах', 'иях', 'ях', 'ы',
+    'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я', 'й',
+    # superlatives and abstract nouns
+    'ейш', 'ейше', 'ость', 'ост',
+), key=len, reverse=True)
+MIN_STEM = 2
+
+
+def stem(word):
+    """Strip one reflexive suffix and the longest inflection"""
+    if len(word) <= 3 or not CYRILLIC_RE.search(word):
+        return word
+    for suffix in REFLEXIVE:
+        if word.endswith(suffix) and len(word) - 2 >= MIN_STEM + 1:
+            word = word[:-2]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def terms(text):
+    return [stem(word) for word in WORD_RE.findall(
+        text.lower().replace('ё', 'е')
+    )]
+
+
+def normalize(text):
+    """Text as it is stored in the index"""
+    return ' '.join(terms(text))
+
+
+TABLES = {'posts_post_fts': 'Post', 'posts_comment_fts': 'Comment'}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, model_name in TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5(body, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        rows = (
+            (pk, normalize(text))
+            for pk, text in apps.get_model('posts', model_name)
+            .objects.values_list('pk', 'text').iterator()
+        )
+        with schema_editor.connection.cursor() as cursor:
+            while True:
+                batch = list(islice(rows, 1000))
+                if not batch:
+                    break
+                cursor.executemany(
+                    f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)',
+                    batch,
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TABLE {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_author_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
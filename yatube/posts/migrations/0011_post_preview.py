@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:18
+
+from django.db import migrations, models
+from django.utils.html import escape
+from django.utils.text import Truncator
+
+# POST_PREVIEW_CHARS when this migration was written.
+PREVIEW_CHARS = 300
+
+
+def make_preview(text):
+    return escape(Truncator(text).chars(PREVIEW_CHARS))
+
+
+def fill_previews(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    # Keyset batches: SQLite must not write to a table it is iterating.
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'text')[:1000]
+        )
+        if not batch:
+            break
+        Post.objects.bulk_update(
+            [Post(pk=pk, preview=make_preview(text)) for pk, text in batch],
+            ['preview'],
+        )
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview',
+            field=models.TextField(blank=True, editable=False, verbose_name='Превью'),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ranking', models.BinaryField(default=bytes, verbose_name='Рейтинг')),
+                ('state', models.BinaryField(null=True, verbose_name='Состояние')),
+                ('locked_until', models.DateTimeField(null=True, verbose_name='Занят до')),
+                ('updated', models.DateTimeField(null=True, verbose_name='Обновлён')),
+            ],
+            options={
+                'verbose_name': 'Снимок популярного',
+                'verbose_name_plural': 'Снимки популярного',
+            },
+        ),
+    ]
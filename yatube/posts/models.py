@@ -1,11 +1,26 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.html import escape
+from django.utils.text import Truncator
 from core.models import CreatedModel
 from django.db.models import UniqueConstraint
 
 
 User = get_user_model()
 
+# Columns includes/article.html reads; the full text stays on disk.
+FEED_FIELDS = (
+    'id', 'created', 'image', 'version', 'preview',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__slug', 'group__title',
+)
+
+
+def make_preview(text):
+    """The escaped start of a post, as the feed cards show it"""
+    return escape(Truncator(text).chars(settings.POST_PREVIEW_CHARS))
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -20,6 +35,26 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Everything includes/article.html touches, and nothing else"""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_api(self):
+        """Full rows for serialize_post(), text included"""
+        return self.select_related('author', 'group')
+
+    def for_detail(self):
+        """Everything posts/post_detail.html touches"""
+        return self.select_related('author__stats', 'group')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for post in objs:
+            post.preview = make_preview(post.text)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Post(CreatedModel):
     author = models.ForeignKey(
         User,
@@ -41,14 +76,59 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True,
     )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+    # Already HTML-escaped: templates output it as is.
+    preview = models.TextField(
+        'Превью',
+        blank=True,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(fields=['-created', '-id'],
+                         name='post_created_idx'),
+            models.Index(fields=['group', '-created'],
+                         name='post_group_created_idx'),
+            models.Index(fields=['author', '-created'],
+                         name='post_author_created_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # A deferred text is not saved, and loading it costs a query.
+            text_saved = 'text' not in self.get_deferred_fields()
+        else:
+            text_saved = 'text' in update_fields
+        if text_saved:
+            self.preview = make_preview(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'preview'}
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_post(self):
+        """Comment authors are rendered next to every comment"""
+        return self.select_related('author')
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -68,7 +148,13 @@ class Comment(CreatedModel):
         verbose_name='Автор'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -92,8 +178,8 @@ class Follow(models.Model):
     )
 
     class Meta:
-        UniqueConstraint(fields=['user', 'author'], name='unique_users')
         constraints = [
+            UniqueConstraint(fields=['user', 'author'], name='unique_users'),
             models.CheckConstraint(
                 check=~models.Q(user=models.F('author')),
                 name='user is not author',
@@ -101,3 +187,101 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's materialized follow feed"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    created = models.DateTimeField(
+        verbose_name='date'
+    )
+
+    class Meta:
+        ordering = ['-created']
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'],
+                             name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created'],
+                         name='timeline_user_created_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class AuthorStats(models.Model):
+    """Counters kept next to a user so profiles need no COUNT queries"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Set while the author's posts are pulled on read instead of pushed,
+    # cleared by timeline.demote() once they have been pushed again.
+    pulled = models.BooleanField('Посты не разосланы', default=False)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class Recommendation(models.Model):
+    """A precomputed who-to-follow suggestion, see posts.recommendations"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Читатель'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор'
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Оценка')
+    mutual = models.PositiveIntegerField('Общих подписок', default=0)
+
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            UniqueConstraint(fields=['user', 'author'],
+                             name='unique_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'],
+                         name='recommendation_user_rank_idx'),
+        ]
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+
+class TrendingSnapshot(models.Model):
+    """The trending feed as last published by posts.trending.update()"""
+    # Post ids, best first, packed as array('q').
+    ranking = models.BinaryField('Рейтинг', default=bytes)
+    # The pickled TrendingState the next run starts from.
+    state = models.BinaryField('Состояние', null=True)
+    locked_until = models.DateTimeField('Занят до', null=True)
+    updated = models.DateTimeField('Обновлён', null=True)
+
+    class Meta:
+        verbose_name = 'Снимок популярного'
+        verbose_name_plural = 'Снимки популярного'
@@ -0,0 +1,90 @@
+"""Event-driven cache for the first pages of the post feeds.
+
+Every feed scope ("index", "group:<id>", "profile:<id>") has a
+generation token. Cached pages remember the tokens they were built
+under; saving or deleting a post replaces the tokens of the scopes it
+appears in, which turns their pages stale at once instead of after a
+fixed timeout.
+
+A stale page is rebuilt by a single worker: whoever wins cache.add() on
+the rebuild lock recomputes it, everyone else keeps serving the stale
+copy until the fresh one lands.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+GLOBAL_SCOPE = '*'
+
+
+def _generation_key(scope):
+    return f'feed-generation:{scope}'
+
+
+def _page_key(scope, page):
+    return f'feed-page:{scope}:{page}'
+
+
+def _lock_key(scope, page):
+    return f'feed-lock:{scope}:{page}'
+
+
+def post_scopes(post):
+    """Feed scopes a post shows up in"""
+    scopes = {'index', f'profile:{post.author_id}'}
+    if post.group_id is not None:
+        scopes.add(f'group:{post.group_id}')
+    return scopes
+
+
+def invalidate(*scopes):
+    """Mark every cached page of the given scopes as stale"""
+    cache.set_many(
+        {_generation_key(scope): uuid.uuid4().hex for scope in scopes},
+        None,
+    )
+
+
+def invalidate_all():
+    invalidate(GLOBAL_SCOPE)
+
+
+def _generations(scope, found):
+    """Current (global, scope) tokens, creating any that got evicted"""
+    tokens = []
+    for name in (GLOBAL_SCOPE, scope):
+        key = _generation_key(name)
+        token = found.get(key)
+        if token is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            token = cache.get(key)
+        tokens.append(token)
+    return tuple(tokens)
+
+
+def cached_page(scope, page, build):
+    """Return build() for the page, served from cache while fresh"""
+    page_key = _page_key(scope, page)
+    found = cache.get_many([
+        _generation_key(GLOBAL_SCOPE), _generation_key(scope), page_key,
+    ])
+    generations = _generations(scope, found)
+    entry = found.get(page_key)
+    if entry is not None:
+        entry_generations, value = entry
+        if entry_generations == generations:
+            return value
+        lock_key = _lock_key(scope, page)
+        if not cache.add(lock_key, 1, settings.FEED_REBUILD_LOCK_TIMEOUT):
+            return value
+        try:
+            value = build()
+            cache.set(page_key, (generations, value),
+                      settings.FEED_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return value
+    value = build()
+    cache.set(page_key, (generations, value), settings.FEED_CACHE_TIMEOUT)
+    return value
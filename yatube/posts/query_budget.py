@@ -0,0 +1,47 @@
+"""Declared per-view query budgets.
+
+Every view states the most queries it may run on its slowest path
+(cold caches, authenticated user). Budgets are only checked when
+QUERY_BUDGET_ENFORCE is on, which the tests switch on, so production
+pays nothing for them.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryLog:
+    """Execute wrapper keeping the SQL of every query it lets through"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+def query_budget(max_queries):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.QUERY_BUDGET_ENFORCE:
+                return view(request, *args, **kwargs)
+            log = QueryLog()
+            with connection.execute_wrapper(log):
+                response = view(request, *args, **kwargs)
+            if len(log.queries) > max_queries:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__} ran {len(log.queries)} queries, '
+                    f'its budget is {max_queries}:\n'
+                    + '\n'.join(log.queries)
+                )
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
@@ -0,0 +1,217 @@
+"""Full-text search over posts and comments.
+
+On SQLite the index lives in two FTS5 tables keyed by rowid, one for
+post texts and one for comment texts, so signals can update or drop a
+single row without scanning. Text is normalised in Python before it
+reaches FTS5: lowercased, "ё" folded into "е" and every Russian word cut
+down to a light stem, so "посты", "постов" and "пост" all match.
+Queries go through the same normalisation.
+
+Other databases have no FTS5; search falls back to icontains there.
+"""
+import re
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+POST_INDEX = 'posts_post_fts'
+COMMENT_INDEX = 'posts_comment_fts'
+
+# Comment hits rank below a post whose own text matches as well.
+COMMENT_WEIGHT = 0.5
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+REFLEXIVE = ('ся', 'сь')
+ENDINGS = sorted((
+    # adjectives and participles
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+    # verbs
+    'ла', 'на', 'ете', 'йте', 'ли', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+    'ешь', 'нно', 'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или',
+    'ыли', 'ил', 'ыл', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит',
+    'ыт', 'ены', 'ить', 'ыть', 'ишь',
+    # nouns
+    'а', 'ев', 'ов', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'иям', 'ям', 'ием', 'ам', 'о', 'у', 'ах', 'иях', 'ях', 'ы',
+    'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я', 'й',
+    # superlatives and abstract nouns
+    'ейш', 'ейше', 'ость', 'ост',
+), key=len, reverse=True)
+MIN_STEM = 2
+
+
+def stem(word):
+    """Strip one reflexive suffix and the longest inflection"""
+    if len(word) <= 3 or not CYRILLIC_RE.search(word):
+        return word
+    for suffix in REFLEXIVE:
+        if word.endswith(suffix) and len(word) - 2 >= MIN_STEM + 1:
+            word = word[:-2]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def terms(text):
+    return [stem(word) for word in WORD_RE.findall(
+        text.lower().replace('ё', 'е')
+    )]
+
+
+def normalize(text):
+    """Text as it is stored in the index"""
+    return ' '.join(terms(text))
+
+
+def match_expression(query):
+    """FTS5 MATCH string: every stem as a quoted prefix, all required"""
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""')) for term in terms(query)
+    )
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def _write(table, pk, text):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {table} (rowid, body) VALUES (%s, %s)',
+            [pk, normalize(text)],
+        )
+
+
+def _drop(table, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+
+def index_post(post):
+    if is_supported():
+        _write(POST_INDEX, post.pk, post.text)
+
+
+def unindex_post(post_id):
+    if is_supported():
+        _drop(POST_INDEX, post_id)
+
+
+def index_comment(comment):
+    if is_supported():
+        _write(COMMENT_INDEX, comment.pk, comment.text)
+
+
+def unindex_comment(comment_id):
+    if is_supported():
+        _drop(COMMENT_INDEX, comment_id)
+
+
+def rebuild_index(batch_size=1000):
+    """Reindex every post and comment, e.g. after a bulk import"""
+    if not is_supported():
+        return
+    for table, model in ((POST_INDEX, Post), (COMMENT_INDEX, Comment)):
+        rows = model.objects.order_by().values_list('pk', 'text')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+            batch = []
+            for pk, text in rows.iterator():
+                batch.append((pk, normalize(text)))
+                if len(batch) == batch_size:
+                    cursor.executemany(
+                        f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)',
+                        batch,
+                    )
+                    batch = []
+            cursor.executemany(
+                f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)', batch
+            )
+
+
+def matching_ids(table, query):
+    """Lazy subquery of the rowids matching query, for pk__in="""
+    return RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s',
+                  [match_expression(query)])
+
+
+class SearchResults:
+    """Ranked post ids for a query, sliceable and countable for Paginator.
+
+    A post matches through its own text or through any of its comments;
+    it is ranked by its best bm25 score, comment hits scaled by
+    COMMENT_WEIGHT.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+        self._count = None
+
+    def _ranked(self):
+        return f'''
+            SELECT post_id, MIN(score) AS score FROM (
+                SELECT rowid AS post_id, bm25({POST_INDEX}) AS score
+                FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %s
+                UNION ALL
+                SELECT comment.post_id,
+                       bm25({COMMENT_INDEX}) * {COMMENT_WEIGHT} AS score
+                FROM {COMMENT_INDEX}
+                JOIN posts_comment AS comment
+                  ON comment.id = {COMMENT_INDEX}.rowid
+                WHERE {COMMENT_INDEX} MATCH %s
+            ) GROUP BY post_id
+        '''
+
+    def count(self):
+        if self._count is None:
+            if not self.expression:
+                self._count = 0
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(*) FROM ({self._ranked()})',
+                        [self.expression, self.expression],
+                    )
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, window):
+        if not isinstance(window, slice):
+            raise TypeError('SearchResults only supports slicing')
+        if not self.expression:
+            return []
+        offset = window.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{self._ranked()} ORDER BY score, post_id DESC '
+                'LIMIT %s OFFSET %s',
+                [self.expression, self.expression,
+                 window.stop - offset, offset],
+            )
+            return [post_id for post_id, _ in cursor.fetchall()]
+
+
+def search_page(query, page_number):
+    """A Page of Post objects for the query, best matches first"""
+    posts = Post.objects.for_feed()
+    if not is_supported():
+        found = posts.filter(text__icontains=query)
+        return Paginator(found, settings.NMB_OF_ITEMS).get_page(page_number)
+    page_obj = Paginator(SearchResults(query),
+                         settings.NMB_OF_ITEMS).get_page(page_number)
+    by_pk = posts.in_bulk(page_obj.object_list)
+    page_obj.object_list = [by_pk[pk] for pk in page_obj.object_list
+                            if pk in by_pk]
+    return page_obj
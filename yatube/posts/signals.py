@@ -0,0 +1,221 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (comment_pages, counters, follow_graph, group_pages,
+               page_cache, recommendations, search, thumbnails, timeline)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Post)
+def bump_post_version(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Post)
+def reload_bumped_version(sender, instance, created, **kwargs):
+    # bump_post_version left an F() expression on the instance.
+    if not created:
+        instance.refresh_from_db(fields=['version'])
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_scopes = set()
+    instance._previous_author_id = instance.author_id
+    instance._previous_group_id = None
+    if instance.pk is None:
+        return
+    previous = Post.objects.filter(pk=instance.pk).only('author', 'group')
+    previous = previous.first()
+    if previous is not None:
+        instance._previous_scopes = page_cache.post_scopes(previous)
+        instance._previous_author_id = previous.author_id
+        instance._previous_group_id = previous.group_id
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_feeds(sender, instance, **kwargs):
+    scopes = page_cache.post_scopes(instance)
+    scopes |= getattr(instance, '_previous_scopes', set())
+    page_cache.invalidate(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    page_cache.invalidate(*page_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    previous_author_id = getattr(instance, '_previous_author_id',
+                                 instance.author_id)
+    if created:
+        counters.shift_author(instance.author_id, 'posts_count', 1)
+    elif previous_author_id != instance.author_id:
+        counters.shift_author(previous_author_id, 'posts_count', -1)
+        counters.shift_author(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.shift_author(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def move_post_between_groups(sender, instance, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id == instance.group_id:
+        return
+    if previous_group_id is not None:
+        group_pages.post_left(previous_group_id)
+    if instance.group_id is not None:
+        group_pages.post_joined(instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post_from_group(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        group_pages.post_left(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created and instance.post_id is not None:
+        counters.shift_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        counters.shift_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_page(sender, instance, **kwargs):
+    comment_pages.invalidate(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def index_saved_text(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    if sender is Post:
+        search.index_post(instance)
+    else:
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    search.unindex_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_followers(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        thumbnails.schedule(instance)
+
+
+@receiver(pre_save, sender=Group)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = (
+        Group.objects.filter(pk=instance.pk).values_list('slug', flat=True)
+        .first() if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    # Deleting a group detaches its posts with an UPDATE, no signals.
+    group_pages.forget_group(instance.pk, instance.slug,
+                             getattr(instance, '_previous_slug', None))
+
+
+@receiver(post_save, sender=Group)
+def bump_group_posts_version(sender, instance, created, **kwargs):
+    if not created:
+        Post.objects.filter(group=instance).update(version=F('version') + 1)
+        page_cache.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def bump_author_posts_version(sender, instance, created, update_fields,
+                              **kwargs):
+    if created:
+        return
+    if update_fields and not AUTHOR_CARD_FIELDS & set(update_fields):
+        return
+    Post.objects.filter(author=instance).update(version=F('version') + 1)
+    page_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def purge_follower_timeline(sender, instance, **kwargs):
+    timeline.purge(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_author(instance.author_id, 'followers_count', 1)
+        counters.shift_author(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.shift_author(instance.author_id, 'followers_count', -1)
+    counters.shift_author(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_delete, sender=Follow)
+def schedule_author_demotion(sender, instance, **kwargs):
+    timeline.schedule_demote(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def drop_followed_recommendation(sender, instance, created, **kwargs):
+    if created:
+        recommendations.drop(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def add_cached_followee(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.add(instance.user_id, instance.author_id)
+    else:
+        follow_graph.forget(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_cached_followee(sender, instance, **kwargs):
+    follow_graph.remove(instance.user_id, instance.author_id)
@@ -0,0 +1,117 @@
+"""File format shared by the export_social and import_social commands.
+
+A snapshot is a directory with one file per table, in the order they
+have to be loaded, and the post images under media/:
+
+    users.ndjson groups.ndjson posts.ndjson comments.ndjson follows.ndjson
+    media/posts/...
+
+Files are newline-delimited JSON objects, or CSV with a header row
+(empty cells are NULL). Foreign keys hold the ids of the source
+database; import_social maps them to the ids the rows get on the
+target. Rows are written in ascending id order, which lets IdMap keep
+that mapping in two packed arrays.
+
+Exports include password hashes: treat a snapshot like the database.
+"""
+import csv
+import json
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('ndjson', 'csv')
+MEDIA_DIR = 'media'
+
+# (file name, model, columns); columns are field names, and foreign
+# keys are written as the raw id.
+TABLES = (
+    ('users', User, ('id', 'username', 'password', 'first_name',
+                     'last_name', 'email', 'is_staff', 'is_superuser',
+                     'is_active', 'date_joined', 'last_login')),
+    ('groups', Group, ('id', 'title', 'slug', 'description')),
+    ('posts', Post, ('id', 'author', 'group', 'text', 'created', 'image')),
+    ('comments', Comment, ('id', 'post', 'author', 'text', 'created')),
+    ('follows', Follow, ('id', 'user', 'author')),
+)
+
+
+def attnames(model, columns):
+    """Database column attributes of the given fields, author -> author_id"""
+    return [model._meta.get_field(column).attname for column in columns]
+
+
+def _encode(value):
+    # DjangoJSONEncoder would round datetimes to milliseconds.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def write_rows(stream, format, columns, rows):
+    """Write value tuples to a text stream, return how many"""
+    written = 0
+    if format == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(['' if value is None else value
+                             for value in row])
+            written += 1
+        return written
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_encode)
+    for row in rows:
+        stream.write(encoder.encode(dict(zip(columns, row))))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+def read_rows(stream, format, model, columns):
+    """Dicts of Python values keyed by column, read lazily"""
+    fields = {column: model._meta.get_field(column) for column in columns}
+    if format == 'csv':
+        records = csv.DictReader(stream)
+    else:
+        records = (json.loads(line) for line in stream if line.strip())
+    for record in records:
+        row = {}
+        for column, field in fields.items():
+            value = record.get(column)
+            if value == '' and format == 'csv' and field.null:
+                value = None
+            if value is not None:
+                target = getattr(field, 'target_field', field)
+                value = target.to_python(value)
+            row[column] = value
+        yield row
+
+
+class IdMap:
+    """Source id -> target id, sixteen bytes an entry.
+
+    Entries must be added in ascending source id order, which is the
+    order snapshots are written in.
+    """
+
+    def __init__(self):
+        self.source = array('q')
+        self.target = array('q')
+
+    def __len__(self):
+        return len(self.source)
+
+    def add(self, source_id, target_id):
+        if self.source and source_id <= self.source[-1]:
+            raise ValueError(f'id {source_id} is out of order')
+        self.source.append(source_id)
+        self.target.append(target_id)
+
+    def get(self, source_id):
+        position = bisect_left(self.source, source_id)
+        if (position < len(self.source)
+                and self.source[position] == source_id):
+            return self.target[position]
+        return None
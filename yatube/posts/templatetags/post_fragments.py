@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.fragments import render_article
+from posts.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def article(post, **flags):
+    return mark_safe(render_article(post, **flags))
+
+
+@register.simple_tag
+def post_thumbnail(post, alias):
+    return thumbnail_url(post, alias)
@@ -0,0 +1,107 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(12)
+        ]
+        Comment.objects.create(post=cls.posts[-1], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, url, client=None, **headers):
+        response = (client or self.client).get(url, **headers)
+        if response.status_code == 200:
+            self.assertTrue(response.streaming)
+            response.data = json.loads(b''.join(response.streaming_content))
+        return response
+
+    def test_feeds(self):
+        reader = Client()
+        reader.force_login(self.reader)
+        for url in (reverse('posts:api_index'),
+                    reverse('posts:api_group_list', kwargs={'slug': 'group'}),
+                    reverse('posts:api_profile',
+                            kwargs={'username': 'author'})):
+            with self.subTest(url=url):
+                data = self.get(url).data
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['text'], 'Пост 11')
+                self.assertEqual(data['results'][0]['comments_count'], 1)
+                self.assertIsNotNone(data['next_cursor'])
+        data = self.get(reverse('posts:api_follow_index'), reader).data
+        self.assertEqual(len(data['results']), 10)
+        data = self.get(reverse('posts:api_group_list',
+                                kwargs={'slug': 'group'})).data
+        self.assertEqual(data['group']['title'], 'Группа')
+
+    def test_cursor_pages(self):
+        first = self.get(reverse('posts:api_index')).data
+        second = self.get(reverse('posts:api_index')
+                          + f'?cursor={first["next_cursor"]}').data
+        self.assertEqual([post['text'] for post in second['results']],
+                         ['Пост 1', 'Пост 0'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_post_detail(self):
+        data = self.get(reverse('posts:api_post_detail',
+                                kwargs={'post_id': self.posts[-1].pk})).data
+        self.assertEqual(data['results'][0]['author'], 'author')
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('posts:api_index')
+        response = self.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_edits_comments_and_new_posts_change_the_etag(self):
+        url = reverse('posts:api_index')
+        etag = self.get(url)['ETag']
+        post = Post.objects.get(pk=self.posts[-1].pk)
+        post.text = 'Исправлено'
+        post.save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['text'], 'Исправлено')
+        etag = response['ETag']
+        Comment.objects.create(post=post, author=self.reader, text='Ещё')
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Post.objects.create(text='Новый', author=self.author)
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['results'][0]['text'], 'Новый')
+
+    def test_if_modified_since_does_not_hide_edits(self):
+        url = reverse('posts:api_post_detail',
+                      kwargs={'post_id': self.posts[0].pk})
+        response = self.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'Исправлено'
+        post.save()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
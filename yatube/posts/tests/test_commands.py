@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..search import SearchResults
+
+
+class ExplainFeedsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Group', slug='group')
+        Post.objects.create(text='Post', author=cls.user, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertIn('post_created_idx', out.getvalue())
+        self.assertIn('post_group_created_idx', out.getvalue())
+        self.assertIn('post_author_created_idx', out.getvalue())
+        self.assertIn('comment_post_created_idx', out.getvalue())
+
+
+class SeedSocialCommandTest(TestCase):
+    def test_generates_consistent_skewed_data(self):
+        call_command('seed_social', users=30, groups=3, posts=300,
+                     comments=500, follows=60, batch_size=40,
+                     stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertGreater(Follow.objects.count(), 0)
+        top = AuthorStats.objects.order_by('-posts_count').first()
+        self.assertGreater(top.posts_count, 300 / 30 * 3)
+        self.assertEqual(top.posts_count,
+                         Post.objects.filter(author=top.user).count())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(SearchResults('generated post').count(), 300)
+        oldest, newest = (Post.objects.order_by('created').first(),
+                          Post.objects.order_by('-created').first())
+        self.assertGreater((newest.created - oldest.created).days, 300)
+        self.assertLess(oldest.pk, newest.pk)
+
+
+class BenchmarkViewsCommandTest(TestCase):
+    def setUp(self):
+        handle, self.baseline = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.baseline)
+        call_command('seed_social', users=5, groups=2, posts=30,
+                     comments=20, follows=5, stdout=StringIO())
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command('benchmark_views', '--iterations', '2', '--warmup', '0',
+                     '--configured-database', '--baseline', self.baseline,
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_covers_every_route_and_cleans_up(self):
+        output = self.benchmark('--save-baseline')
+        with open(self.baseline) as baseline:
+            results = json.load(baseline)
+        for name in ('client index', 'wsgi index', 'client add_comment',
+                     'wsgi fragment_cache_stats'):
+            self.assertIn(name, results)
+            self.assertIn(name, output)
+        self.assertNotIn('wsgi add_comment', results)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_configured_database_is_not_seeded(self):
+        with self.assertRaisesMessage(CommandError, 'test database'):
+            self.benchmark('--seed-posts', '10')
+        self.assertEqual(Post.objects.count(), 30)
+
+    def test_regression_against_baseline_fails(self):
+        self.benchmark('--save-baseline')
+        with open(self.baseline) as baseline:
+            results = json.load(baseline)
+        results['client index']['queries'] = 0
+        with open(self.baseline, 'w') as baseline:
+            json.dump(results, baseline)
+        with self.assertRaisesMessage(CommandError, 'client index'):
+            self.benchmark('--tolerance', '1000')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SocialSnapshotCommandTest(TestCase):
+    def setUp(self):
+        self.snapshot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT,
+                        ignore_errors=True)
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(title='Group', slug='group')
+        self.post = Post.objects.create(text='Exported pelican',
+                                        author=self.author, group=self.group)
+        # Set outside save(), so no thumbnail render races the cleanup.
+        image = default_storage.save('posts/pic.gif', ContentFile(b'GIF89a'))
+        Post.objects.filter(pk=self.post.pk).update(image=image)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Exported comment')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def round_trip(self, format):
+        call_command('export_social', self.snapshot, '--format', format,
+                     '--chunk-size', '1', stdout=StringIO())
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.filter(username='reader').delete()
+        call_command('import_social', self.snapshot, '--format', format,
+                     '--batch-size', '1', stdout=StringIO())
+
+    def assert_restored(self):
+        post = Post.objects.get()
+        reader = User.objects.get(username='reader')
+        self.assertEqual((post.author, post.group, post.text),
+                         (self.author, self.group, 'Exported pelican'))
+        self.assertEqual(post.created, self.post.created)
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().author, reader)
+        with post.image.open() as image:
+            self.assertEqual(image.read(), b'GIF89a')
+        self.assertTrue(Follow.objects.filter(user=reader,
+                                              author=self.author).exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(reader.stats.following_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=reader,
+                                                     post=post).exists())
+        self.assertEqual(SearchResults('pelican')[:10], [post.pk])
+        self.assertEqual(User.objects.filter(username='author').count(), 1)
+
+    def test_ndjson_round_trip(self):
+        self.round_trip('ndjson')
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv')
+        self.assert_restored()
+
+    def test_dangling_reference_is_an_error(self):
+        call_command('export_social', self.snapshot, '--skip-media',
+                     stdout=StringIO())
+        os.remove(os.path.join(self.snapshot, 'users.ndjson'))
+        with self.assertRaisesMessage(CommandError, 'not in the snapshot'):
+            call_command('import_social', self.snapshot, stdout=StringIO())
+
+
+class BenchmarkGroupPagesCommandTest(TestCase):
+    def test_compares_both_paths_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_group_pages', '--posts', '60',
+                     '--iterations', '2', '--batch-size', '25',
+                     '--configured-database', stdout=out)
+        self.assertIn('paginate_page  page 1', out.getvalue())
+        self.assertIn('group_page     page 6', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Group.objects.exists())
@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_queue, search
+from ..models import Comment, Post, User
+
+
+class NextBatchTests(SimpleTestCase):
+    @override_settings(COMMENT_FLUSH_BATCH=2, COMMENT_FLUSH_INTERVAL=0.01)
+    def test_batches_are_bounded(self):
+        for item in 'abc':
+            comment_queue._queue.put(item)
+        self.assertEqual(comment_queue.next_batch(timeout=1), ['a', 'b'])
+        self.assertEqual(comment_queue.next_batch(timeout=1), ['c'])
+
+
+@override_settings(COMMENT_WRITE_BEHIND=True)
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def comment(self, text):
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': text},
+        )
+
+    def shown(self, client):
+        return [comment.text
+                for comment in client.get(self.url).context['comments']]
+
+    def test_author_reads_own_queued_comment(self):
+        self.comment('Сначала')
+        self.comment('Потом')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.shown(self.reader_client), ['Потом', 'Сначала'])
+        self.assertEqual(self.shown(Client()), [])
+
+    def test_invalid_comment_is_not_queued(self):
+        self.comment('')
+        self.assertEqual(self.shown(self.reader_client), [])
+
+    def test_flush_does_the_work_of_the_comment_signals(self):
+        self.shown(Client())
+        queued = [Comment(post=self.post, author=self.reader,
+                          text=f'Очередь {i}') for i in range(3)]
+        self.assertEqual(comment_queue.flush(queued), 3)
+        self.assertEqual(
+            sorted(Comment.objects.values_list('pk', flat=True)),
+            sorted(comment.pk for comment in queued),
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(len(self.shown(Client())), 3)
+        self.assertEqual(search.SearchResults('очередь')[:10], [self.post.pk])
+
+    def test_failed_flush_can_be_retried(self):
+        queued = [Comment(post=self.post, author=self.reader,
+                          text=f'Повтор {i}') for i in range(2)]
+        with mock.patch.object(search, 'index_comment',
+                               side_effect=OperationalError('locked')):
+            with self.assertRaises(OperationalError):
+                comment_queue.flush(queued)
+        self.assertEqual([comment.pk for comment in queued], [None, None])
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Между попытками')
+        self.assertEqual(comment_queue.flush(queued), 2)
+        self.assertEqual(
+            set(Comment.objects.filter(text__startswith='Повтор')
+                .values_list('pk', flat=True)),
+            {comment.pk for comment in queued},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+
+    def test_flushed_comment_is_not_shown_twice(self):
+        self.comment('Один раз')
+        comment_queue.flush([Comment(post=self.post, author=self.reader,
+                                     text='Один раз')])
+        self.assertEqual(self.shown(self.reader_client), ['Один раз'])
+
+    def test_comments_on_deleted_posts_are_dropped(self):
+        post = Post.objects.create(text='Удалю', author=self.author)
+        queued = Comment(post=post, author=self.reader, text='Поздно')
+        post.delete()
+        self.assertEqual(comment_queue.flush([queued]), 0)
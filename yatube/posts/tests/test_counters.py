@@ -0,0 +1,97 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import reconcile
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter_follows_creates_and_deletes(self):
+        post = Post.objects.create(text='Counted', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_view_shifts_comment_counter(self):
+        post = Post.objects.create(text='Counted', author=self.author)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Comment'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_views_shift_follow_counters(self):
+        follow_url = reverse('posts:profile_follow',
+                             kwargs={'username': self.author.username})
+        unfollow_url = reverse('posts:profile_unfollow',
+                               kwargs={'username': self.author.username})
+        self.reader_client.get(follow_url)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(unfollow_url)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_post_edit_leaves_comment_counter_alone(self):
+        post = Post.objects.create(text='Counted', author=self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                {'text': 'Edited'},
+            )
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "posts_post"')]
+        self.assertTrue(updates)
+        self.assertFalse([sql for sql in updates if 'comments_count' in sql])
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.version), ('Edited', 2))
+
+    def test_uncounted_rows_do_not_go_below_zero(self):
+        post = Post.objects.create(text='Counted', author=self.author)
+        Comment.objects.bulk_create(
+            [Comment(text='Bulk', post=post, author=self.reader)])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)])
+        Comment.objects.filter(post=post).delete()
+        Follow.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        post = Post.objects.create(text='Counted', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(text='Comment', post=post, author=self.reader)
+        AuthorStats.objects.update(posts_count=7, followers_count=7,
+                                   following_count=7)
+        Post.objects.update(comments_count=7)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        self.assertEqual(reconcile(), {'author_stats': 2, 'posts': 1})
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(reconcile(), {'author_stats': 0, 'posts': 0})
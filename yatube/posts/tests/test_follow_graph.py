@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.authors = [User.objects.create(username=f'author-{i}')
+                       for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_followees_are_loaded_once_and_kept_sorted(self):
+        for author in reversed(self.authors[:3]):
+            Follow.objects.create(user=self.reader, author=author)
+        with self.assertNumQueries(1):
+            ids = follow_graph.followee_ids(self.reader.pk)
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk, self.authors[0].pk))
+        self.assertEqual(list(ids),
+                         sorted(author.pk for author in self.authors[:3]))
+
+    def test_follow_and_unfollow_patch_the_cached_array(self):
+        first, second = self.authors[:2]
+        follow_graph.followee_ids(self.reader.pk)
+        Follow.objects.create(user=self.reader, author=second)
+        Follow.objects.create(user=self.reader, author=first)
+        Follow.objects.filter(user=self.reader, author=second).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(list(follow_graph.followee_ids(self.reader.pk)),
+                             [first.pk])
+
+    def test_following_many(self):
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        Follow.objects.create(user=self.reader, author=self.authors[3])
+        asked = [author.pk for author in self.authors] + [0]
+        self.assertEqual(
+            follow_graph.following_many(self.reader.pk, asked),
+            {self.authors[1].pk, self.authors[3].pk},
+        )
+
+    def test_profile_reads_following_from_the_cache(self):
+        author = self.authors[0]
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': author.username}))
+        self.assertTrue(self.client.get(url).context['following'])
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': author.username}))
+        self.assertFalse(self.client.get(url).context['following'])
+
+    def test_follow_view_survives_a_stale_cache(self):
+        author = self.authors[0]
+        follow_graph.followee_ids(self.reader.pk)
+        # Written behind the signals' back, e.g. by another process
+        # whose cache this one does not share.
+        Follow.objects.bulk_create([Follow(user=self.reader, author=author)])
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+        self.assertRedirects(response, reverse('posts:index'))
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertTrue(follow_graph.is_following(self.reader.pk, author.pk))
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..fragments import fragment_stats, render_article
+from ..models import Group, Post, User
+
+
+class ArticleFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Group', slug='group', description='Description'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Cached card', author=self.user, group=self.group
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_second_render_is_a_hit(self):
+        before = fragment_stats()
+        first = render_article(self.post, index_page=True)
+        second = render_article(self.post, index_page=True)
+        after = fragment_stats()
+        self.assertEqual(first, second)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_post_edit_bumps_version(self):
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Edited card', 'group': self.group.pk},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        self.assertIn('Edited card', render_article(self.post))
+
+    def test_saved_instance_holds_the_bumped_version(self):
+        self.post.text = 'Saved directly'
+        self.post.save()
+        self.assertEqual(self.post.version, 2)
+
+    def test_group_and_author_changes_bump_version(self):
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.user.first_name = 'Lev'
+        self.user.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 3)
+        self.assertIn('/group/renamed/', render_article(self.post))
+
+    def test_login_does_not_bump_version(self):
+        self.user.save(update_fields=['last_login'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 1)
+
+    def test_stats_are_staff_only(self):
+        url = reverse('posts:fragment_cache_stats')
+        self.assertEqual(self.authorized_client.get(url).status_code, 302)
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.authorized_client.force_login(staff)
+        self.assertIn('hit_rate', self.authorized_client.get(url).json())
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import group_pages
+from ..models import Group, Post, User
+
+
+@override_settings(NMB_OF_ITEMS=2, FEED_CACHE_PAGES=2)
+class GroupPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Group', slug='group')
+        cls.other = Group.objects.create(title='Other', slug='other')
+        cls.posts = [Post.objects.create(text=f'Post {i}', author=cls.author,
+                                         group=cls.group)
+                     for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, slug='group', page=1):
+        return self.client.get(reverse('posts:group_list',
+                                       kwargs={'slug': slug}),
+                               {'page': page})
+
+    def test_group_is_cached_by_slug(self):
+        group_pages.get_group('group')
+        with self.assertNumQueries(0):
+            self.assertEqual(group_pages.get_group('group'), self.group)
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertEqual(self.page('group').status_code, 404)
+        self.assertEqual(self.page('renamed').status_code, 200)
+
+    def test_counts_follow_posts_joining_and_leaving(self):
+        group_pages.post_count(self.group.pk)
+        group_pages.post_count(self.other.pk)
+        post = Post.objects.create(text='New', author=self.author,
+                                   group=self.group)
+        self.posts[0].group = self.other
+        self.posts[0].save()
+        self.posts[1].delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(group_pages.post_count(self.group.pk), 4)
+            self.assertEqual(group_pages.post_count(self.other.pk), 1)
+        self.assertEqual(list(self.page().context['page_obj']),
+                         [post, self.posts[4]])
+
+    def test_new_post_rebuilds_first_page_without_count(self):
+        self.page()
+        post = Post.objects.create(text='New', author=self.author,
+                                   group=self.group)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.page(page=2)
+        self.assertFalse([query for query in queries
+                          if 'COUNT(' in query['sql']])
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[3], self.posts[2]])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages,
+                         3)
+        self.assertEqual(self.page().context['page_obj'][0], post)
+        self.assertNotIn('posts', response.context)
+
+    def test_deep_and_out_of_range_pages(self):
+        self.assertEqual(list(self.page(page=3).context['page_obj']),
+                         [self.posts[0]])
+        self.assertEqual(list(self.page(page=9).context['page_obj']),
+                         [self.posts[0]])
+
+    def test_deleted_group_is_forgotten(self):
+        self.page()
+        Group.objects.filter(pk=self.group.pk).delete()
+        self.assertEqual(self.page().status_code, 404)
@@ -1,9 +1,19 @@
+import shutil
+import tempfile
+
+from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
 
-from ..models import Group, Post, User
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostModelTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -33,6 +43,11 @@ class PostModelTest(TestCase):
             image=cls.uploadedfile,
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     def test_models_correct_object_names(self):
         correct_names = {
             self.post.text[:15]: str(self.post),
@@ -41,3 +56,49 @@ class PostModelTest(TestCase):
         for object, correct_name in correct_names.items():
             with self.subTest(correct_names=correct_names):
                 self.assertEqual(correct_name, object)
+
+    def test_follow_is_unique_per_user_and_author(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=reader, author=self.user)
+
+
+@override_settings(POST_PREVIEW_CHARS=10)
+class PostPreviewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_preview_is_truncated_and_escaped_on_save(self):
+        post = Post.objects.create(author=self.user,
+                                   text='<b>bold</b> and more')
+        self.assertEqual(post.preview, '&lt;b&gt;bold&lt;/…')
+        post.text = 'Short'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.preview, 'Short')
+
+    def test_bulk_create_fills_previews(self):
+        Post.objects.bulk_create([Post(author=self.user, text='a & b')])
+        self.assertEqual(Post.objects.get().preview, 'a &amp; b')
+
+    def test_feeds_leave_the_full_text_unloaded(self):
+        Post.objects.create(author=self.user, text='x' * 50)
+        post = Post.objects.for_feed().get()
+        self.assertIn('text', post.get_deferred_fields())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'x' * 9 + '…')
+        self.assertNotContains(response, 'x' * 11)
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=[post.pk]))
+        self.assertContains(response, 'x' * 50)
+
+    def test_saves_without_the_text_keep_it_unloaded(self):
+        Post.objects.create(author=self.user, text='x' * 50)
+        post = Post.objects.for_feed().get()
+        post.save(update_fields=['group'])
+        post.save()
+        self.assertIn('text', post.get_deferred_fields())
+        self.assertEqual(Post.objects.get().preview, 'x' * 9 + '…')
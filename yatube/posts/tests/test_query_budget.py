@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post, User
+from ..query_budget import QueryBudgetExceeded, query_budget
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.other = User.objects.create(username='other')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.group = Group.objects.create(title='Group', slug='group')
+        for i in range(15):
+            cls.post = Post.objects.create(text=f'Post {i}',
+                                           author=cls.author,
+                                           group=cls.group)
+        for i in range(10):
+            commenter = User.objects.create(username=f'commenter{i}')
+            Comment.objects.create(post=cls.post, author=commenter,
+                                   text=f'Comment {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_every_view_declares_a_budget(self):
+        for pattern in urls.urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_views_stay_within_budget_on_cold_cache(self):
+        post_id = {'post_id': self.post.pk}
+        requests = (
+            (self.reader_client.get, reverse('posts:index'), None),
+            (self.reader_client.get,
+             reverse('posts:group_list', kwargs={'slug': 'group'}), None),
+            (self.reader_client.get,
+             reverse('posts:profile', kwargs={'username': 'author'}), None),
+            (self.reader_client.get,
+             reverse('posts:post_detail', kwargs=post_id), None),
+            (self.reader_client.get,
+             reverse('posts:post_comments', kwargs=post_id), None),
+            (self.author_client.get,
+             reverse('posts:post_edit', kwargs=post_id), None),
+            (self.author_client.post,
+             reverse('posts:post_edit', kwargs=post_id),
+             {'text': 'Edited', 'group': self.group.pk}),
+            (self.author_client.get, reverse('posts:post_create'), None),
+            (self.author_client.post, reverse('posts:post_create'),
+             {'text': 'New'}),
+            (self.reader_client.post,
+             reverse('posts:add_comment', kwargs=post_id),
+             {'text': 'Comment'}),
+            (self.reader_client.get, reverse('posts:follow_index'), None),
+            (self.reader_client.get, reverse('posts:trending'), None),
+            (self.reader_client.get,
+             reverse('posts:profile_follow', kwargs={'username': 'other'}),
+             None),
+            (self.reader_client.get,
+             reverse('posts:profile_unfollow',
+                     kwargs={'username': 'other'}),
+             None),
+            (self.reader_client.get, reverse('posts:search'),
+             {'q': 'Post'}),
+            (self.staff_client.get, reverse('posts:fragment_cache_stats'),
+             None),
+            (self.reader_client.get, reverse('posts:api_index'), None),
+            (self.reader_client.get,
+             reverse('posts:api_group_list', kwargs={'slug': 'group'}),
+             None),
+            (self.reader_client.get,
+             reverse('posts:api_profile', kwargs={'username': 'author'}),
+             None),
+            (self.reader_client.get, reverse('posts:api_follow_index'),
+             None),
+            (self.reader_client.get,
+             reverse('posts:api_post_detail', kwargs=post_id), None),
+        )
+        for method, url, data in requests:
+            with self.subTest(url=url, method=method.__name__):
+                cache.clear()
+                response = method(url, data) if data else method(url)
+                self.assertIn(response.status_code, (200, 302))
+
+    def test_post_detail_comments_are_not_n_plus_one(self):
+        for i in range(10):
+            commenter = User.objects.create(username=f'late{i}')
+            Comment.objects.create(post=self.post, author=commenter,
+                                   text=f'Late {i}')
+        response = self.reader_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_exceeding_budget_fails(self):
+        @query_budget(0)
+        def greedy_view(request):
+            return list(Post.objects.all())
+
+        with self.assertRaises(QueryBudgetExceeded):
+            greedy_view(None)
@@ -0,0 +1,63 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, Recommendation, User
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.neighbour, cls.star, cls.other = (
+            User.objects.create(username=name) for name in
+            ('reader', 'friend', 'neighbour', 'star', 'other')
+        )
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.star)
+        Follow.objects.create(user=cls.neighbour, author=cls.friend)
+        Follow.objects.create(user=cls.neighbour, author=cls.other)
+
+    def suggested(self, user):
+        return [(row.author, row.mutual)
+                for row in recommendations.for_user(user)]
+
+    def test_friends_of_friends_and_cofollowers_are_suggested(self):
+        recommendations.compute()
+        suggested = self.suggested(self.reader)
+        self.assertEqual({author for author, _ in suggested},
+                         {self.star, self.other})
+        self.assertIn((self.star, 1), suggested)
+        self.assertIn((self.other, 0), suggested)
+
+    def test_followed_authors_and_self_are_excluded(self):
+        recommendations.compute()
+        for user in User.objects.all():
+            with self.subTest(user=user):
+                followed = set(user.follower.values_list('author', flat=True))
+                suggested = {author.pk for author, _ in self.suggested(user)}
+                self.assertFalse(suggested & (followed | {user.pk}))
+
+    def test_following_a_suggestion_drops_it(self):
+        recommendations.compute()
+        Follow.objects.create(user=self.reader, author=self.star)
+        self.assertNotIn(self.star, [author for author, _ in
+                                     self.suggested(self.reader)])
+
+    def test_readers_without_follows_lose_stale_rows(self):
+        recommendations.compute()
+        Follow.objects.filter(user=self.neighbour).delete()
+        recommendations.compute()
+        self.assertFalse(
+            Recommendation.objects.filter(user=self.neighbour).exists()
+        )
+
+    def test_follow_feed_shows_suggestions_in_one_query(self):
+        recommendations.compute()
+        with self.assertNumQueries(1):
+            recommendations.for_user(self.reader)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, reverse('posts:profile',
+                                              args=['star']))
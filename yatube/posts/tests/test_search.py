@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, User
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_word_forms_share_a_stem(self):
+        self.assertEqual(search.normalize('посты постов пост'),
+                         'пост пост пост')
+        self.assertEqual(search.normalize('Красивая красивые'),
+                         'красив красив')
+
+    def test_yo_is_folded(self):
+        self.assertEqual(search.normalize('Ёлка'), search.normalize('елка'))
+
+    def test_query_cannot_inject_fts_syntax(self):
+        self.assertEqual(search.match_expression('a" OR "b'),
+                         '"a"* "or"* "b"*')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.cats = Post.objects.create(
+            text='Мои кошки любят спать', author=cls.author)
+        cls.dogs = Post.objects.create(
+            text='Собаки гуляют во дворе', author=cls.author)
+        Comment.objects.create(post=cls.dogs, author=cls.author,
+                               text='А у меня кошка')
+
+    def search(self, query, **params):
+        response = Client().get(reverse('posts:search'),
+                                {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_post_text_and_comments_are_found(self):
+        page_obj = self.search('кошками')
+        self.assertEqual(list(page_obj), [self.cats, self.dogs])
+        self.assertEqual(page_obj.paginator.count, 2)
+
+    def test_index_follows_edits_and_deletes(self):
+        cats = Post.objects.get(pk=self.cats.pk)
+        cats.text = 'Теперь про попугаев'
+        cats.save()
+        self.assertEqual(list(self.search('кошки')), [self.dogs])
+        self.assertEqual(list(self.search('попугай')), [cats])
+        self.dogs.comments.all().delete()
+        self.assertEqual(list(self.search('кошки')), [])
+        cats.delete()
+        self.assertEqual(self.search('попугай').paginator.count, 0)
+
+    def test_results_are_paginated(self):
+        for i in range(settings.NMB_OF_ITEMS + 2):
+            Post.objects.create(text=f'Дождь номер {i}', author=self.author)
+        self.assertEqual(len(self.search('дожди')), settings.NMB_OF_ITEMS)
+        self.assertEqual(len(self.search('дожди', page=2)), 2)
+
+    def test_empty_query_renders_the_form(self):
+        response = Client().get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create(username='admin', is_staff=True,
+                                    is_superuser=True)
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'собака'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dogs])
+        response = client.get(reverse('admin:posts_comment_changelist'),
+                              {'q': 'кошками'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': '?!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 0)
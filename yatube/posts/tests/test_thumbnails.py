@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ..fragments import render_article
+from ..models import Post, User
+from ..thumbnails import generate, thumbnail_url
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.user = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            text='With image',
+            author=cls.user,
+            image=SimpleUploadedFile(name='small.gif', content=small_gif,
+                                     content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        self.assertIsNone(thumbnail_url(self.post, 'feed'))
+        self.assertIn('bg-light', render_article(self.post))
+        self.assertNotIn('<img', render_article(self.post))
+
+    def test_generate_publishes_url_and_refreshes_card(self):
+        render_article(self.post)
+        generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        url = thumbnail_url(self.post, 'feed')
+        self.assertTrue(url.startswith(settings.MEDIA_URL))
+        self.assertIn(f'src="{url}"', render_article(self.post))
+
+    def test_post_without_image_has_no_thumbnail(self):
+        post = Post.objects.create(text='Plain', author=self.user)
+        generate(post.pk)
+        self.assertIsNone(thumbnail_url(post, 'feed'))
@@ -0,0 +1,78 @@
+from django.test import TestCase, override_settings
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import demote, demote_pending, timeline_posts, trim
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='writer')
+        cls.stranger = User.objects.create(username='stranger')
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Pushed', author=self.author)
+        Post.objects.create(text='Not followed', author=self.stranger)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        posts = [Post.objects.create(text=f'Old {i}', author=self.author)
+                 for i in range(3)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(set(timeline_posts(self.reader)), set(posts))
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertFalse(timeline_posts(self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_pulled_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Pulled', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_the_limit_again_is_pushed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(text='Pulled', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        Follow.objects.filter(user=self.stranger).delete()
+        self.assertTrue(demote(self.author.pk))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+        self.assertFalse(demote(self.author.pk))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=3)
+    def test_demotion_does_not_need_the_exact_boundary(self):
+        followers = [self.reader, self.stranger,
+                     User.objects.create(username='third')]
+        for user in followers:
+            Follow.objects.create(user=user, author=self.author)
+        post = Post.objects.create(text='Pulled', author=self.author)
+        self.assertFalse(demote(self.author.pk))
+        # Two unfollows before the background job gets to run.
+        Follow.objects.filter(user__in=followers[1:]).delete()
+        self.assertEqual(demote_pending(), 1)
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    @override_settings(TIMELINE_MAX_ENTRIES=2)
+    def test_trim_keeps_newest_entries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'Post {i}', author=self.author)
+                 for i in range(4)]
+        trim(self.reader.pk)
+        kept = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(set(kept.values_list('post_id', flat=True)),
+                         {posts[-1].pk, posts[-2].pk})
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Post, TrendingSnapshot, User
+
+
+class BoundedRankingTests(TestCase):
+    def test_keeps_the_best_entries_sorted(self):
+        ranking = trending.BoundedRanking(3)
+        for post_id, key in ((1, 5.0), (2, 1.0), (3, 3.0), (4, 4.0)):
+            ranking.set(post_id, key)
+        self.assertEqual(ranking.top(10), [1, 4, 3])
+        self.assertEqual(ranking.set(3, 6.0), None)
+        self.assertEqual(ranking.top(2), [3, 1])
+        self.assertEqual(ranking.set(5, 7.0), 4)
+        self.assertNotIn(4, ranking)
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.star = User.objects.create(username='star')
+        cls.readers = [User.objects.create(username=f'reader{i}')
+                       for i in range(4)]
+        cls.quiet, cls.busy, cls.famous = (
+            Post.objects.create(text=text, author=author)
+            for text, author in (('Тихий', cls.author),
+                                 ('Обсуждаемый', cls.author),
+                                 ('Звёздный', cls.star))
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, age=timedelta()):
+        comment = Comment.objects.create(post=post, author=self.readers[0],
+                                         text='Комментарий')
+        Comment.objects.filter(pk=comment.pk).update(
+            created=timezone.now() - age)
+
+    def test_comment_velocity_ranks_posts(self):
+        for _ in range(3):
+            self.comment(self.busy)
+        self.comment(self.quiet)
+        trending.update()
+        self.assertEqual(trending.ranking(), [self.busy.pk, self.quiet.pk])
+
+    def test_older_comments_weigh_less(self):
+        half_life = timedelta(seconds=trending.settings.TRENDING_HALF_LIFE)
+        for _ in range(3):
+            self.comment(self.busy, age=half_life * 2)
+        self.comment(self.quiet)
+        trending.update()
+        self.assertEqual(trending.ranking(), [self.quiet.pk, self.busy.pk])
+
+    def test_follower_reach_lifts_posts(self):
+        self.comment(self.famous, age=timedelta(minutes=30))
+        self.comment(self.busy)
+        trending.update()
+        self.assertEqual(trending.ranking()[0], self.busy.pk)
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.star)
+        trending.update()
+        self.assertEqual(trending.ranking()[0], self.famous.pk)
+
+    def test_runs_are_incremental(self):
+        self.comment(self.quiet)
+        self.assertEqual(trending.update(), 1)
+        self.comment(self.busy)
+        self.comment(self.busy)
+        self.assertEqual(trending.update(), 2)
+        self.assertEqual(trending.ranking(), [self.busy.pk, self.quiet.pk])
+
+    def test_comments_before_the_lookback_are_skipped(self):
+        lookback = timedelta(seconds=trending.settings.TRENDING_LOOKBACK)
+        self.comment(self.quiet, age=lookback * 2)
+        self.comment(self.busy)
+        self.assertEqual(trending.update(), 1)
+        self.assertEqual(trending.ranking(), [self.busy.pk])
+
+    @override_settings(TRENDING_CANDIDATES=1)
+    def test_candidates_are_bounded(self):
+        self.comment(self.quiet)
+        self.comment(self.busy)
+        self.comment(self.busy)
+        trending.update()
+        self.assertEqual(trending.ranking(), [self.busy.pk])
+
+    def test_page_is_served_from_the_ranking(self):
+        self.comment(self.busy)
+        trending.update()
+        with self.assertNumQueries(1):
+            response = Client().get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['page_obj']), [self.busy])
+
+    def test_ranking_is_shared_through_the_database(self):
+        self.comment(self.busy)
+        trending.update()
+        # A web worker with its own cache, e.g. locmem in another process.
+        cache.clear()
+        self.assertEqual(trending.ranking(), [self.busy.pk])
+        self.comment(self.quiet)
+        cache.clear()
+        self.assertEqual(trending.update(), 1)
+
+    def test_concurrent_runs_are_locked_out(self):
+        TrendingSnapshot.objects.create(
+            pk=trending.SNAPSHOT_ID,
+            locked_until=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(trending.update())
+        TrendingSnapshot.objects.update(
+            locked_until=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(trending.update(), 0)
+        self.assertIsNone(TrendingSnapshot.objects.get().locked_until)
@@ -1,15 +1,23 @@
+import shutil
+import tempfile
+
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..forms import PostForm
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import CURSOR_PREVIOUS, CursorPage, encode_cursor
 
 from django.core.cache import cache
 
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -69,6 +77,11 @@ class PostPagesTests(TestCase):
             cls.profile_url,
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         cache.clear()
         self.authorized_client = Client()
@@ -229,18 +242,52 @@ class PostPagesTests(TestCase):
         self.assertRedirects(response, redirect_url, status_code=302)
 
     def test_cache(self):
+        index_url = reverse('posts:index')
+        self.authorized_client.get(index_url)
         cache_post = Post.objects.create(
             text='CachePostText',
             author=self.user,
         )
-        post_add = self.authorized_client.get(reverse('posts:index')).content
+        post_add = self.authorized_client.get(index_url)
+        self.assertIn(cache_post, post_add.context['page_obj'])
         cache_post.delete()
-        post_del = self.authorized_client.get(reverse('posts:index')).content
-        self.assertEqual(post_add, post_del)
-        cache.clear()
-        post_clear_cache = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotEqual(post_add, post_clear_cache)
+        post_del = self.authorized_client.get(index_url)
+        self.assertNotIn(cache_post, post_del.context['page_obj'])
+        self.assertNotEqual(post_add.content, post_del.content)
+
+    def test_cache_serves_stale_page_during_rebuild(self):
+        index_url = reverse('posts:index')
+        self.authorized_client.get(index_url)
+        page_key = 'feed-page:index:1'
+        stale = cache.get(page_key)
+        cache_post = Post.objects.create(
+            text='CachePostText',
+            author=self.user,
+        )
+        cache.add('feed-lock:index:1', 1)
+        response = self.authorized_client.get(index_url)
+        self.assertNotIn(cache_post, response.context['page_obj'])
+        self.assertEqual(cache.get(page_key), stale)
+        cache.delete('feed-lock:index:1')
+        response = self.authorized_client.get(index_url)
+        self.assertIn(cache_post, response.context['page_obj'])
+
+    def test_moving_post_invalidates_old_group_page(self):
+        other_group = Group.objects.create(title='Other', slug='other')
+        moved = Post.objects.create(text='Moving', author=self.user,
+                                    group=self.group)
+        group_url = reverse('posts:group_list',
+                            kwargs={'slug': self.group.slug})
+        self.assertIn(moved,
+                      self.authorized_client.get(group_url).context[
+                          'page_obj'])
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': moved.pk}),
+            {'text': 'Moving', 'group': other_group.pk},
+        )
+        self.assertNotIn(moved,
+                         self.authorized_client.get(group_url).context[
+                             'page_obj'])
 
     def test_follow(self):
         follow_user = User.objects.create(username='TestAuthor')
@@ -319,3 +366,126 @@ class PaginatorViewsTest(TestCase):
         for response in page_posts_qty:
             with self.subTest(response=response):
                 self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        expected = list(
+            Post.objects.order_by('-created', '-pk').values_list('pk',
+                                                                 flat=True)
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url + '?cursor=').context['page_obj']
+                self.assertIsNone(first.paginator)
+                self.assertEqual(len(first), settings.NMB_OF_ITEMS)
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    url + f'?cursor={first.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(len(second), 2)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    [post.pk for post in first] + [post.pk for post in second],
+                    expected,
+                )
+                back = self.client.get(
+                    url + f'?cursor={second.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual([post.pk for post in back],
+                                 [post.pk for post in first])
+
+    def test_profile_cards_link_to_the_full_post(self):
+        post = Post.objects.create(text='Длинный пост ' * 40,
+                                   author=self.user)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user}))
+        self.assertContains(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+
+    def test_previous_cursor_past_the_newest_post(self):
+        newest = Post.objects.order_by('-created', '-pk').first()
+        token = encode_cursor(newest, CURSOR_PREVIOUS)
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': token})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), settings.NMB_OF_ITEMS)
+        self.assertFalse(page.has_previous())
+        empty = CursorPage([], True, True)
+        self.assertIsNone(empty.next_cursor)
+        self.assertIsNone(empty.previous_cursor)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?cursor=%%%')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.NMB_OF_ITEMS)
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.post = Post.objects.create(text='Commented', author=cls.user)
+        for i in range(7):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Comment {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentPagesTest.user)
+        self.detail_url = reverse('posts:post_detail',
+                                  kwargs={'post_id': self.post.pk})
+        self.comments_url = reverse('posts:post_comments',
+                                    kwargs={'post_id': self.post.pk})
+
+    def test_post_detail_shows_first_page_only(self):
+        response = self.authorized_client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         [f'Comment {i}' for i in range(6, 1, -1)])
+        self.assertContains(response, self.comments_url + '?cursor=')
+
+    def test_further_pages_load_as_fragment_and_json(self):
+        first = self.authorized_client.get(self.detail_url)
+        cursor = first.context['comments'].next_cursor
+        fragment = self.authorized_client.get(self.comments_url,
+                                              {'cursor': cursor})
+        self.assertContains(fragment, 'Comment 1')
+        self.assertNotContains(fragment, 'Показать ещё')
+        data = self.authorized_client.get(
+            self.comments_url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual([comment['text'] for comment in data['comments']],
+                         ['Comment 1', 'Comment 0'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_comments_of_missing_post_are_not_found(self):
+        missing_url = reverse('posts:post_comments',
+                              kwargs={'post_id': self.post.pk + 100})
+        self.assertEqual(self.authorized_client.get(missing_url).status_code,
+                         404)
+        empty = Post.objects.create(text='No comments', author=self.user)
+        empty_url = reverse('posts:post_comments',
+                            kwargs={'post_id': empty.pk})
+        self.assertEqual(self.authorized_client.get(empty_url).status_code,
+                         200)
+
+    def test_new_comment_refreshes_cached_first_page(self):
+        self.authorized_client.get(self.detail_url)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Fresh comment'},
+        )
+        response = self.authorized_client.get(self.detail_url)
+        self.assertEqual(response.context['comments'][0].text,
+                         'Fresh comment')
+        self.assertContains(response, 'Комментариев: 8')
@@ -0,0 +1,92 @@
+"""Background pre-generation of post thumbnails.
+
+Saving a post with an image enqueues one sorl-thumbnail render per
+alias in THUMBNAIL_ALIASES on a small thread pool. Finished URLs are
+recorded in the cache, templates only read them and show a placeholder
+until they are there, so no page view ever pays for a Pillow resize.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from sorl.thumbnail import get_thumbnail
+
+from . import page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PENDING_TIMEOUT = 60
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _url_key(post_id, image_name, alias):
+    return f'thumbnail:{alias}:{post_id}:{image_name}'
+
+
+def _pending_key(post_id, image_name):
+    return f'thumbnail-pending:{post_id}:{image_name}'
+
+
+def thumbnail_url(post, alias):
+    """URL of a finished thumbnail, None while it is being rendered"""
+    if not post.image:
+        return None
+    url = cache.get(_url_key(post.pk, post.image.name, alias))
+    if url is None:
+        schedule(post)
+    return url
+
+
+def generate(post_id):
+    """Render every alias of a post's image and publish the URLs"""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    published = False
+    for alias, (geometry, options) in settings.THUMBNAIL_ALIASES.items():
+        key = _url_key(post.pk, post.image.name, alias)
+        if cache.get(key) is not None:
+            continue
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        cache.set(key, thumbnail.url, None)
+        published = True
+    if published:
+        # Cards cached with the placeholder must be rendered again.
+        Post.objects.filter(pk=post.pk).update(version=F('version') + 1)
+        page_cache.invalidate(*page_cache.post_scopes(post))
+
+
+def _run(post_id, pending_key):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Thumbnail generation failed for post %s', post_id)
+    finally:
+        cache.delete(pending_key)
+        close_old_connections()
+
+
+def schedule(post):
+    """Enqueue thumbnail generation once the post is committed"""
+    pending_key = _pending_key(post.pk, post.image.name)
+    if not cache.add(pending_key, 1, THUMBNAIL_PENDING_TIMEOUT):
+        return
+    post_id = post.pk
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, post_id, pending_key)
+    )
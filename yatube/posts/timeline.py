@@ -0,0 +1,228 @@
+"""Fan-out-on-write follow feed.
+
+Every follower of an ordinary author gets a TimelineEntry row when the
+author publishes, so the follow feed is a lookup on the follower's own
+(user, created) index. Authors followed by more than
+TIMELINE_FANOUT_LIMIT users are not pushed anywhere: their posts are
+pulled at read time and merged into the same queryset, and their
+AuthorStats row is marked as pulled. Once such an author falls back
+below the limit, demote() pushes their recent posts to every follower
+from a background thread and clears the mark.
+"""
+import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, reset_queries, transaction
+from django.db.models import Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .utils import batches
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # One thread: demotions are rare and each one writes a lot.
+        _executor = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix='timeline')
+    return _executor
+
+
+def celebrity_ids(author_ids):
+    """Those of the given authors whose posts are pulled, not pushed"""
+    return list(
+        AuthorStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def mark_pulled(author_id):
+    """Whether the author's posts are pulled; if so, remember it"""
+    return bool(AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(pulled=True))
+
+
+def trim(user_id):
+    """Drop everything older than the newest TIMELINE_MAX_ENTRIES"""
+    cap = settings.TIMELINE_MAX_ENTRIES
+    boundary = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-created')
+        .values_list('created', flat=True)[cap - 1:cap]
+    )
+    boundary = list(boundary)
+    if boundary:
+        TimelineEntry.objects.filter(
+            user_id=user_id, created__lt=boundary[0]
+        ).delete()
+
+
+def fan_out(post):
+    """Push a freshly created post into its author's followers' feeds.
+
+    Trimming is amortised: followers are trimmed on roughly one fan-out
+    in TIMELINE_TRIM_EVERY, so the cap may be exceeded by a few entries.
+    """
+    if mark_pulled(post.author_id):
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator()
+    )
+    should_trim = post.pk % settings.TIMELINE_TRIM_EVERY == 0
+    for batch in batches(follower_ids, settings.TIMELINE_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post.pk,
+                           created=post.created)
+             for user_id in batch),
+            ignore_conflicts=True,
+        )
+        if should_trim:
+            for user_id in batch:
+                trim(user_id)
+
+
+def backfill(user_id, author_id):
+    """Copy an author's recent posts into a new follower's feed"""
+    if mark_pulled(author_id):
+        return
+    recent = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-created')
+        .values_list('pk', 'created')[:settings.TIMELINE_MAX_ENTRIES]
+    )
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, created=created)
+         for pk, created in recent),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def demote(author_id):
+    """Push a former celebrity's recent posts into all followers' feeds.
+
+    Does nothing unless the author is marked as pulled and is below
+    TIMELINE_FANOUT_LIMIT now; the mark is cleared first, so concurrent
+    or repeated calls push at most once. Returns whether it pushed.
+    """
+    claimed = AuthorStats.objects.filter(
+        user_id=author_id, pulled=True,
+        followers_count__lt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(pulled=False)
+    if not claimed:
+        return False
+    try:
+        recent = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-created')
+            .values_list('pk', 'created')[:settings.TIMELINE_MAX_ENTRIES]
+        )
+        follower_ids = (
+            Follow.objects.filter(author_id=author_id)
+            .values_list('user_id', flat=True)
+            .iterator()
+        )
+        for batch in batches(follower_ids, settings.TIMELINE_BATCH_SIZE):
+            with transaction.atomic():
+                TimelineEntry.objects.bulk_create(
+                    (TimelineEntry(user_id=user_id, post_id=pk,
+                                   created=created)
+                     for user_id in batch for pk, created in recent),
+                    batch_size=settings.TIMELINE_BATCH_SIZE,
+                    ignore_conflicts=True,
+                )
+                for user_id in batch:
+                    trim(user_id)
+            reset_queries()
+    except Exception:
+        AuthorStats.objects.filter(user_id=author_id).update(pulled=True)
+        raise
+    return True
+
+
+def demote_pending():
+    """Demote every marked author below the limit, return how many"""
+    author_ids = list(
+        AuthorStats.objects.filter(
+            pulled=True,
+            followers_count__lt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+    return sum(demote(author_id) for author_id in author_ids)
+
+
+def _run_demote(author_id):
+    try:
+        demote(author_id)
+    except Exception:
+        logger.exception('Pushing the posts of author %s failed', author_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_demote(author_id):
+    """Check the author for demotion once the unfollow is committed"""
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run_demote, author_id)
+    )
+
+
+def purge(user_id, author_id):
+    """Remove an unfollowed author's posts from the follower's feed"""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Refill a follower's feed from scratch, e.g. after a bulk import"""
+    authors = Follow.objects.filter(user_id=user_id).values('author_id')
+    recent = (
+        Post.objects.filter(author_id__in=authors)
+        .exclude(author_id__in=celebrity_ids(authors))
+        .order_by('-created')
+        .values_list('pk', 'created')[:settings.TIMELINE_MAX_ENTRIES]
+    )
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, created=created)
+         for pk, created in recent),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+    )
+
+
+def rebuild_all():
+    """Refill every follower's feed, return how many there were"""
+    followers = array('q')
+    followers.extend(Follow.objects.order_by().values_list(
+        'user_id', flat=True).distinct().iterator())
+    # One transaction per chunk of feeds instead of a commit per
+    # INSERT: on SQLite this is most of the rebuilding time.
+    for batch in batches(followers, 100):
+        with transaction.atomic():
+            for user_id in batch:
+                rebuild(user_id)
+        reset_queries()
+    return len(followers)
+
+
+def timeline_posts(user):
+    """The follow feed of a user: pushed entries plus pulled celebrities"""
+    followed = Follow.objects.filter(user=user).values('author_id')
+    pushed = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=pushed) | Q(author_id__in=celebrity_ids(followed))
+    )
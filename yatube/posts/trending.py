@@ -0,0 +1,216 @@
+"""Trending feed ranked by comment velocity and author reach.
+
+Every comment adds heat to its post, and heat halves every
+TRENDING_HALF_LIFE seconds. Heat is kept as log2 of its value at a
+fixed epoch: a comment made at time t is worth
+(t - EPOCH) / TRENDING_HALF_LIFE there, so ageing never has to be
+applied to the stored scores and newer activity simply weighs more.
+The rank key adds log2(log2(2 + followers)) of the post's author. That
+way reach scales the score without drowning out the comments.
+
+update() is the background job. It folds in the comments past the
+watermark kept from its last run, then reloads the follower counts of
+the tracked authors from AuthorStats, which the follow signals keep
+current. That one query also picks up unfollows, which leave no rows
+behind to scan. Only the best TRENDING_CANDIDATES posts are tracked, in
+a sorted list. A post that falls out of the candidates forgets its
+heat.
+
+The state and the top TRENDING_SIZE ids are stored in the single
+TrendingSnapshot row, so update() can run in any process: cron, a
+long-lived update_trending or a web worker. Pages keep the published
+ids in the cache for TRENDING_CACHE_TIMEOUT seconds.
+"""
+import math
+import pickle
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils import timezone as django_timezone
+
+from .models import AuthorStats, Comment, Post, TrendingSnapshot
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+SNAPSHOT_ID = 1
+RANKING_KEY = 'trending:ranking'
+
+
+def _log2_add(a, b):
+    """log2(2 ** a + 2 ** b) without leaving log space"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def comment_heat(created):
+    """log2 of one comment's heat at EPOCH"""
+    return (created - EPOCH).total_seconds() / settings.TRENDING_HALF_LIFE
+
+
+def reach_bonus(followers):
+    return math.log2(math.log2(2 + max(followers, 0)))
+
+
+class BoundedRanking:
+    """The best `size` (key, post id) pairs, kept sorted ascending"""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = []
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, post_id):
+        return post_id in self.keys
+
+    def set(self, post_id, key):
+        """Place a post at key, return the id pushed out, if any"""
+        previous = self.keys.get(post_id)
+        if previous is not None:
+            del self.entries[bisect_left(self.entries, (previous, post_id))]
+        insort(self.entries, (key, post_id))
+        self.keys[post_id] = key
+        if len(self.entries) <= self.size:
+            return None
+        _, evicted = self.entries.pop(0)
+        del self.keys[evicted]
+        return evicted
+
+    def top(self, count):
+        return [post_id for _, post_id in reversed(self.entries[-count:])]
+
+
+class TrendingState:
+    """Everything update() carries from one run to the next"""
+
+    def __init__(self, comment_id):
+        self.comment_id = comment_id
+        self.ranking = BoundedRanking(settings.TRENDING_CANDIDATES)
+        self.heat = {}
+        self.authors = {}
+        self.reach = {}
+
+    @classmethod
+    def start(cls, now):
+        """Fresh state that replays the last TRENDING_LOOKBACK seconds"""
+        since = now - timedelta(seconds=settings.TRENDING_LOOKBACK)
+        return cls(Comment.objects.filter(created__lt=since)
+                   .aggregate(last=Max('pk'))['last'] or 0)
+
+    def add_comments(self, comments):
+        """Heat up posts from (post id, created) pairs, return their ids"""
+        for post_id, created in comments:
+            self.heat[post_id] = _log2_add(self.heat.get(post_id),
+                                           comment_heat(created))
+        unknown = set(self.heat) - set(self.authors)
+        self.authors.update(Post.objects.filter(pk__in=unknown)
+                            .values_list('pk', 'author_id'))
+        for post_id in unknown - set(self.authors):
+            del self.heat[post_id]
+        return {post_id for post_id, _ in comments if post_id in self.heat}
+
+    def refresh_reach(self):
+        """Reload follower counts, return the posts whose authors changed"""
+        counts = dict(
+            AuthorStats.objects
+            .filter(user_id__in=set(self.authors.values()))
+            .values_list('user_id', 'followers_count')
+        )
+        changed = {post_id for post_id, author_id in self.authors.items()
+                   if counts.get(author_id) != self.reach.get(author_id)}
+        self.reach = counts
+        return changed
+
+    def rank(self, post_ids):
+        for post_id in post_ids:
+            if post_id not in self.heat:
+                continue
+            key = self.heat[post_id] + reach_bonus(
+                self.reach.get(self.authors[post_id], 0))
+            evicted = self.ranking.set(post_id, key)
+            if evicted is not None:
+                del self.heat[evicted]
+                del self.authors[evicted]
+
+
+def _lock(now):
+    """Take the snapshot row for one run, False if another run has it"""
+    TrendingSnapshot.objects.get_or_create(pk=SNAPSHOT_ID)
+    return bool(
+        TrendingSnapshot.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+            pk=SNAPSHOT_ID,
+        ).update(locked_until=now + timedelta(
+            seconds=settings.TRENDING_LOCK_TIMEOUT))
+    )
+
+
+def update(batch_size=1000, now=None):
+    """Fold new comments and follower counts into the ranking.
+
+    Returns the number of comments read, or None when another run holds
+    the lock.
+    """
+    now = now or django_timezone.now()
+    if not _lock(now):
+        return None
+    snapshot = TrendingSnapshot.objects.filter(pk=SNAPSHOT_ID)
+    try:
+        saved = snapshot.values_list('state', flat=True).first()
+        state = (pickle.loads(saved) if saved is not None
+                 else TrendingState.start(now))
+        processed = 0
+        while True:
+            comments = list(
+                Comment.objects.filter(pk__gt=state.comment_id)
+                .exclude(post=None).order_by('pk')
+                .values_list('pk', 'post_id', 'created')[:batch_size]
+            )
+            if not comments:
+                break
+            state.comment_id = comments[-1][0]
+            state.rank(state.add_comments(
+                [(post_id, created) for _, post_id, created in comments]
+            ))
+            processed += len(comments)
+        state.rank(state.refresh_reach())
+        published = array(
+            'q', state.ranking.top(settings.TRENDING_SIZE)).tobytes()
+        snapshot.update(state=pickle.dumps(state), ranking=published,
+                        updated=now)
+        cache.set(RANKING_KEY, published, settings.TRENDING_CACHE_TIMEOUT)
+        return processed
+    finally:
+        snapshot.update(locked_until=None)
+
+
+def ranking():
+    """Post ids of the trending feed, best first"""
+    published = cache.get(RANKING_KEY)
+    if published is None:
+        published = bytes(
+            TrendingSnapshot.objects.filter(pk=SNAPSHOT_ID)
+            .values_list('ranking', flat=True).first() or b''
+        )
+        cache.set(RANKING_KEY, published, settings.TRENDING_CACHE_TIMEOUT)
+    ids = array('q')
+    ids.frombytes(published)
+    return list(ids)
+
+
+def trending_page(page_number):
+    """One numbered page of the published ranking, in one query"""
+    page_obj = Paginator(ranking(), settings.NMB_OF_ITEMS).get_page(
+        page_number)
+    by_pk = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [by_pk[pk] for pk in page_obj.object_list
+                            if pk in by_pk]
+    return page_obj
@@ -1,9 +1,192 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from datetime import datetime
+from itertools import islice
+
 from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+from core.concurrency import run_concurrently
+
+from .page_cache import cached_page
+
+CURSOR_PARAM = 'cursor'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(item, direction=CURSOR_NEXT):
+    """Pack the (created, id) key of an item into an opaque token"""
+    raw = f'{direction}|{item.created.isoformat()}|{item.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor token, return None for anything malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, created, pk = raw.split('|')
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+            return None
+        return direction, datetime.fromisoformat(created), int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+class CursorPage:
+    """One keyset page of a feed, ordered by (created, id) descending.
+
+    Mimics the parts of django.core.paginator.Page the templates use,
+    but knows nothing about the total number of items or pages.
+    """
+    paginator = None
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
 
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], CURSOR_NEXT)
+        return None
 
-def paginate_page(queryset, request):
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], CURSOR_PREVIOUS)
+        return None
+
+
+def paginate_cursor(queryset, token, per_page=None):
+    """Keyset pagination: no COUNT(*) and no OFFSET scan.
+
+    The page is fetched with a single query filtered on (created, id),
+    so its cost does not depend on how deep into the feed we are. The
+    redundant bound on created lets the database seek into the index
+    instead of walking it from the top.
+    """
+    per_page = per_page or settings.NMB_OF_ITEMS
+    cursor = decode_cursor(token) if token else None
+    if cursor is None:
+        rows = list(queryset.order_by('-created', '-pk')[:per_page + 1])
+        return CursorPage(rows[:per_page], len(rows) > per_page, False)
+    direction, created, pk = cursor
+    if direction == CURSOR_NEXT:
+        rows = list(
+            queryset.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk),
+                created__lte=created,
+            ).order_by('-created', '-pk')[:per_page + 1]
+        )
+        return CursorPage(rows[:per_page], len(rows) > per_page, True)
+    rows = list(
+        queryset.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk),
+            created__gte=created,
+        ).order_by('created', 'pk')[:per_page + 1]
+    )
+    if not rows:
+        # Nothing newer than the token, e.g. the top post was deleted.
+        return paginate_cursor(queryset, None, per_page)
+    page = rows[:per_page]
+    page.reverse()
+    return CursorPage(page, True, len(rows) > per_page)
+
+
+def page_number(request):
+    """The ?page= number of a request, 1 for anything invalid"""
+    try:
+        return max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def numbered_page(paginator, page_number):
+    """paginator.get_page() with the count and the rows read side by side.
+
+    The rows are fetched for the requested number before the count says
+    whether it exists; an empty page past the first falls back to
+    get_page(), which serves the last one.
+    """
+    bottom = (page_number - 1) * paginator.per_page
+    _, rows = run_concurrently(
+        lambda: paginator.count,
+        lambda: list(paginator.object_list[bottom:
+                                           bottom + paginator.per_page]),
+    )
+    if not rows and page_number > 1:
+        return paginator.get_page(page_number)
+    return Page(rows, page_number, paginator)
+
+
+def paginate_page(queryset, request, cache_scope=None):
+    """Numbered pages by default, keyset pages once a cursor is passed.
+
+    With a cache_scope the first FEED_CACHE_PAGES numbered pages are
+    served from the feed page cache, see posts.page_cache.
+    """
+    if CURSOR_PARAM in request.GET:
+        return paginate_cursor(queryset, request.GET.get(CURSOR_PARAM))
     paginator = Paginator(queryset, settings.NMB_OF_ITEMS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    requested = page_number(request)
+    if cache_scope is None or requested > settings.FEED_CACHE_PAGES:
+        return numbered_page(paginator, requested)
+
+    def build():
+        page_obj = numbered_page(paginator, requested)
+        return page_obj.number, list(page_obj), paginator.count
+
+    number, object_list, count = cached_page(cache_scope, requested,
+                                             build)
+    paginator.count = count
+    return Page(object_list, number, paginator)
+
+
+def assign_bulk_pks(objects):
+    """Fill in the primary keys bulk_create could not return.
+
+    Only PostgreSQL hands them back. The rows must have gone in within
+    the current transaction: on SQLite, which keeps the write lock until
+    commit, they then hold the newest consecutive ids.
+    """
+    if not objects or objects[0].pk is not None:
+        return
+    model = type(objects[0])
+    last = model.objects.order_by('-pk').values_list('pk', flat=True)[0]
+    for pk, instance in enumerate(objects, last - len(objects) + 1):
+        instance.pk = pk
+
+
+def batches(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -1,70 +1,136 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Follow
+from .models import Post, User, Follow
+from . import comment_queue, follow_graph
 from .forms import PostForm, CommentForm
-from .utils import paginate_page
+from .utils import CURSOR_PARAM, page_number, paginate_page
+from .search import search_page
+from .trending import trending_page
+from .group_pages import get_group, group_page
+from .comment_pages import comment_page
+from .recommendations import for_user as recommendations_for
+from .timeline import timeline_posts
+from .fragments import fragment_stats
+from .query_budget import query_budget
+from core.concurrency import run_concurrently
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
 
 
-@cache_page(20, key_prefix='index_page')
+@query_budget(4)
 def index(request):
     """Homepage return"""
-    posts = Post.objects.select_related('author', 'group').all()
+    posts = Post.objects.for_feed()
     context = {
-        'page_obj': paginate_page(posts, request),
+        'page_obj': paginate_page(posts, request, cache_scope='index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(3)
+def trending(request):
+    """Posts ranked by recent comments and their authors' reach"""
+    context = {
+        'page_obj': trending_page(page_number(request)),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(6)
 def group_posts(request, slug):
     """Group page return"""
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.select_related('author').all()
+    group = get_group(slug)
     context = {
         'group': group,
-        'posts': posts,
-        'page_obj': paginate_page(posts, request),
+        'page_obj': group_page(group, request),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(7)
 def profile(request, username):
     """Profile page return"""
-    author = get_object_or_404(User, username=username)
-    posts = author.author_posts.select_related('group').all()
+    # Load the user here, not concurrently inside one of the workers.
+    authenticated = request.user.is_authenticated
+    author, recommendations = run_concurrently(
+        lambda: get_object_or_404(User.objects.select_related('stats'),
+                                  username=username),
+        lambda: recommendations_for(request.user),
+    )
+    following = (authenticated
+                 and request.user.pk != author.pk
+                 and follow_graph.is_following(request.user.pk, author.pk))
+    posts = author.author_posts.for_feed()
     context = {
         'author': author,
-        'page_obj': paginate_page(posts, request),
-        'following':
-            request.user.is_authenticated
-            and request.user != author
-            and Follow.objects.filter(author=author,
-                                      user=request.user).exists(),
+        'page_obj': paginate_page(posts, request,
+                                  cache_scope=f'profile:{author.pk}'),
+        'following': following,
+        'recommendations': recommendations,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(4)
 def post_detail(request, post_id):
     """Post detail page return"""
-    post = get_object_or_404(Post, id=post_id)
+    post, comments = run_concurrently(
+        lambda: get_object_or_404(Post.objects.for_detail(), id=post_id),
+        lambda: comment_page(post_id),
+    )
     context = {
         'post': post,
         'form': CommentForm(),
-        'comments': post.comments.all(),
+        'comments': comment_queue.with_pending(comments, post_id,
+                                               request.user),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(2)
+def post_comments(request, post_id):
+    """Further comment pages, as an HTML fragment or JSON"""
+    page = comment_page(post_id, request.GET.get(CURSOR_PARAM))
+    # Comments imply their post, so only an empty page needs the check.
+    if (not page.object_list
+            and not Post.objects.filter(pk=post_id).exists()):
+        raise Http404('No Post matches the given query.')
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': getattr(comment.author, 'username', None),
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in page
+            ],
+            'next_cursor': page.next_cursor,
+        })
+    context = {
+        'comments': page,
+        'post_id': post_id,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(9)
 @login_required
 def post_edit(request, post_id):
     """Post edit return"""
     posts = get_object_or_404(Post, id=post_id)
-    if request.user != posts.author:
+    if request.user.pk != posts.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=posts)
     if form.is_valid():
-        form.save()
+        # Only the edited columns: a full save would write back the
+        # comments_count loaded above over concurrent increments.
+        form.save(commit=False).save(
+            update_fields=[*form.changed_data, 'version'])
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -74,10 +140,11 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(9)
 @login_required
 def post_create(request):
     """Post create return"""
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
@@ -89,6 +156,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(6)
 @login_required
 def add_comment(request, post_id):
     """Add comment return. Get the post and save it in the post variable"""
@@ -98,40 +166,68 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            comment_queue.enqueue(comment)
+        else:
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
     """The posts of the authors that the current user is subscribed to"""
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = timeline_posts(request.user).for_feed()
     context = {
         'page_obj': paginate_page(posts, request),
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(12)
 @login_required
 def profile_follow(request, username):
     """Subscription follow function"""
     author = get_object_or_404(User, username=username)
-    if request.user.username == username or Follow.objects.filter(
-        user=request.user, author=author
-    ).exists():
+    if request.user.pk == author.pk:
+        return redirect('posts:index')
+    # The unique constraint decides, not the cached followees, which
+    # may be stale.
+    try:
+        with transaction.atomic():
+            Follow.objects.create(
+                author=author, user=request.user,
+            )
+    except IntegrityError:
+        follow_graph.forget(request.user.pk)
         return redirect('posts:index')
-    follower = Follow.objects.create(
-        author=author, user=request.user,
-    )
-    follower.save()
     return redirect('posts:profile', username)
 
 
+@query_budget(9)
 @login_required
 def profile_unfollow(request, username):
     """Subscription unfollow function"""
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=request.user, author=author)
-    if following.exists():
-        following.delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:index')
+
+
+@query_budget(5)
+def search(request):
+    """Posts ranked by how well they or their comments match the query"""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': search_page(query, page_number(request))
+        if query else None,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(2)
+@staff_member_required
+def fragment_cache_stats(request):
+    """Hit rate of the article fragment cache in this worker"""
+    return JsonResponse(fragment_stats())
@@ -1,4 +1,5 @@
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,7 +47,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,13 +65,48 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+SQLITE_PATH = os.path.join(BASE_DIR, 'db.sqlite3')
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': SQLITE_PATH,
     }
 }
 
+# DB_PROFILE=production tunes SQLite for concurrent serving: WAL so
+# readers and the writer don't block each other, synchronous=NORMAL
+# (durable in WAL mode, fsyncs only at checkpoints), a 256 MiB mmap and
+# a 64 MiB page cache, a 10 s busy timeout and persistent connections.
+# DB_READ_REPLICA=1 also sends the reads of GET requests to a second,
+# read-only connection, see core.db.
+DB_PROFILE = os.getenv('DB_PROFILE', 'default')
+if DB_PROFILE == 'production':
+    SQLITE_READ_PRAGMAS = {
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'memory',
+    }
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'timeout': 10},
+        'PRAGMAS': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            **SQLITE_READ_PRAGMAS,
+        },
+    })
+    if os.getenv('DB_READ_REPLICA') == '1':
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{SQLITE_PATH}?mode=ro',
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {'timeout': 10},
+            'PRAGMAS': {'query_only': 'on', **SQLITE_READ_PRAGMAS},
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_ROUTERS = ['core.db.ReadReplicaRouter']
+        MIDDLEWARE.insert(1, 'core.middleware.ReadReplicaMiddleware')
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,6 +139,9 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 NMB_OF_ITEMS = 10
+# Feed cards show the first POST_PREVIEW_CHARS of a post, stored apart
+# from its text; the full text is only loaded on the post page.
+POST_PREVIEW_CHARS = 300
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -112,10 +152,130 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# CACHE_BACKEND=locmem keeps a private cache per worker process. Any
+# other value puts a shared tier behind a short-lived in-process L1:
+# "file" and "database" need nothing extra ("database" needs
+# manage.py createcachetable), "redis" needs django-redis installed.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+SHARED_CACHE_BACKENDS = {
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, '.cache'),
+    ),
+    'database': (
+        'django.core.cache.backends.db.DatabaseCache',
+        'yatube_cache',
+    ),
+    'redis': (
+        'django_redis.cache.RedisCache',
+        'redis://127.0.0.1:6379/1',
+    ),
 }
 
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+elif CACHE_BACKEND not in SHARED_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f'Unknown CACHE_BACKEND {CACHE_BACKEND!r}, expected one of: '
+        + ', '.join(['locmem', *SHARED_CACHE_BACKENDS])
+    )
+else:
+    SHARED_CACHE_BACKEND, SHARED_CACHE_LOCATION = (
+        SHARED_CACHE_BACKENDS[CACHE_BACKEND]
+    )
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 2)),
+            },
+        },
+        'shared': {
+            'BACKEND': SHARED_CACHE_BACKEND,
+            'LOCATION': CACHE_LOCATION or SHARED_CACHE_LOCATION,
+            'TIMEOUT': 60 * 60,
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+            },
+        },
+    }
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Follow feed: posts are pushed into followers' timelines on write,
+# authors with more followers than the limit are pulled on read instead.
+TIMELINE_MAX_ENTRIES = 500
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_TRIM_EVERY = 20
+
+# Followee ids per reader, see posts.follow_graph.
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60 * 24
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# First pages of the feeds are cached until a post in them changes.
+FEED_CACHE_PAGES = 5
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_REBUILD_LOCK_TIMEOUT = 10
+# Groups by slug, their post counts and first page ids, see
+# posts.group_pages.
+GROUP_CACHE_TIMEOUT = 60 * 60
+
+# Checked by posts.query_budget; tests turn it on.
+QUERY_BUDGET_ENFORCE = False
+
+COMMENTS_PER_PAGE = 20
+COMMENTS_CACHE_TIMEOUT = 60 * 60
+
+# Thumbnails are rendered ahead of time by a background pool,
+# templates only ever read the finished URLs.
+THUMBNAIL_ALIASES = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_WORKERS = 2
+
+# Share of requests run under cProfile by RequestMetricsMiddleware,
+# e.g. METRICS_PROFILE_RATE=0.01 to keep one request in a hundred.
+METRICS_PROFILE_RATE = float(os.getenv('METRICS_PROFILE_RATE', 0))
+METRICS_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Who-to-follow: compute_recommendations keeps TOP_K per reader, pages
+# show the first SHOWN of them.
+RECOMMENDATIONS_TOP_K = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_MAX_COFOLLOWERS = 200
+
+# Trending feed: update_trending folds new comments into a decayed
+# score per post and stores the top TRENDING_SIZE ids in the database,
+# so it can run from cron or as its own process with any cache. Pages
+# cache those ids for TRENDING_CACHE_TIMEOUT seconds.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_LOOKBACK = 2 * 24 * 60 * 60
+TRENDING_CANDIDATES = 1000
+TRENDING_SIZE = 200
+TRENDING_LOCK_TIMEOUT = 10 * 60
+TRENDING_CACHE_TIMEOUT = 60
+
+# yatube.asgi serves requests from a pool of ASGI_THREADS threads;
+# feed views run independent queries on FEED_QUERY_WORKERS more.
+# 0 keeps them sequential, which in-memory SQLite test databases need.
+# Extra workers cut latency on a slow or remote database at low load,
+# but cost throughput once requests are CPU-bound: see
+# "manage.py benchmark_concurrency --db-latency".
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 32))
+FEED_QUERY_WORKERS = int(os.getenv('FEED_QUERY_WORKERS', 0))
+
+# Write-behind comments, see posts.comment_queue. Off unless
+# COMMENT_WRITE_BEHIND=1; queued comments are lost if a worker dies.
+COMMENT_WRITE_BEHIND = os.getenv('COMMENT_WRITE_BEHIND') == '1'
+COMMENT_FLUSH_INTERVAL = 0.2
+COMMENT_FLUSH_BATCH = 200
+COMMENT_FLUSH_ATTEMPTS = 8
+COMMENT_PENDING_TIMEOUT = 60
@@ -3,10 +3,13 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics_snapshot
+
 
 urlpatterns = [
     path('auth/', include('users.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_snapshot, name='metrics'),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),